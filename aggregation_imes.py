@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Time period aggregation: contiguous time periods with similar demand, supply
+factors, given supply and costs are merged into blocks, the model is solved
+on one period per block, and the investments are expanded back to the full
+horizon.
+
+Only contiguous periods are merged (agglomerative clustering along time), so
+the installed capacity keeps its meaning: the investments of a block are made
+in its first period, at the discounted costs of that period, and are
+installed in all periods of the block. The block is solved for the worst
+period of the block (highest demand, lowest supply factors and given supply),
+and its investment costs are exactly the objective of the aggregated model.
+The investment limits of a block are the sums of the limits of its periods;
+investments above the limit of the first period are made in the next periods
+of the block. These, and storage content, which moves between blocks instead
+of between periods, can make the expanded investments fall short in some
+periods; the repair step
+solves the full horizon with the expanded investments as lower bounds, which
+only adds the missing investments (a small MIP).
+
+The number of blocks (n_periods) or the largest merge distance
+(max_distance) sets the trade-off between accuracy and speed. The report
+gives the objective of the aggregated model, after the repair, and, with
+reference=True, the relative error against a solve of the full horizon.
+
+Usage:
+    investments, report = SolveAggregated(case, n_periods=6, reference=True)
+    print(report['objective_error'])
+
+The time periods must be in chronological order (as in the TimePeriods
+sheet).
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from case_imes import BuildModel
+from investment_limits_imes import InvestmentLimits, INVESTMENT_LIMIT_COLUMNS
+from pyomo_helper_imes import RunningLocalServer, InvestmentSolution
+from rolling_horizon_imes import TIME_PARAMETER_NAMES, PlanCost
+from solvers_imes import DEFAULT_PROFILE
+
+# Parameters that are taken from the worst period of a block, and how; the
+# other time parameters (the costs) are taken from the first period
+WORST_CASE = {'demand': max, 'supply_external_factor': min,
+              'amount_given': min}
+# The investment limits are per period, and the investments of a block are
+# all made in its first period, so the limit of a block is the sum of the
+# limits of its periods (see AggregatedLimits)
+
+# Investment variables and the set of their type (the first index)
+LIMIT_TYPES = {'LineInvestmentMade': 'energy_carriers',
+               'SupplyInvestmentMade': 'supply_types',
+               'ConverterInvestmentMade': 'energy_converters',
+               'StorageInvestmentMade': 'energy_carriers'}
+
+
+def PeriodProfiles(case):
+    # One row per time period with all time parameters of the case (one
+    # column per parameter and index), each column scaled by its mean
+    # absolute value so that all parameters weigh the same
+    columns = {}
+    for name in TIME_PARAMETER_NAMES:
+        if(not isinstance(case[name], dict)):
+            continue
+        for (key, value) in case[name].items():
+            columns.setdefault((name,) + key[:-1], {})[key[-1]] = value
+    profiles = pd.DataFrame(columns).reindex(case['time_periods']).fillna(0)
+    scale = profiles.abs().mean()
+    return profiles.loc[:, scale > 0] / scale[scale > 0]
+
+
+def PeriodBlocks(case, n_periods=None, max_distance=None):
+    # Merge neighbouring time periods, the most similar pair of blocks first
+    # (distance: root mean square difference of the mean profiles), until
+    # n_periods blocks are left or the distance of every pair of neighbours
+    # is more than max_distance. Returns a list of blocks (lists of time
+    # periods).
+    if(n_periods is None and max_distance is None):
+        raise ValueError("Give n_periods or max_distance")
+    profiles = PeriodProfiles(case).to_numpy()
+    blocks = [[x] for x in case['time_periods']]
+    sums = [profiles[i] for i in range(len(blocks))]
+
+    def Distance(i):
+        return np.sqrt(np.mean((sums[i] / len(blocks[i]) -
+                                sums[i + 1] / len(blocks[i + 1]))**2))
+
+    while(len(blocks) > max(n_periods or 1, 1)):
+        distances = [Distance(i) for i in range(len(blocks) - 1)]
+        i = int(np.argmin(distances))
+        if(max_distance is not None and distances[i] > max_distance):
+            break
+        blocks[i:i + 2] = [blocks[i] + blocks[i + 1]]
+        sums[i:i + 2] = [sums[i] + sums[i + 1]]
+    return blocks
+
+
+def AggregatedLimits(case, blocks):
+    # Investment limits table (see investment_limits_imes) of the aggregated
+    # case: per type, location and block the sum of the limits of the
+    # periods of the block; no limit when a period has none
+    limits = InvestmentLimits(case.get('investment_limits'))
+    rows = []
+    for (variable, type_set) in LIMIT_TYPES.items():
+        for investment_type in case[type_set]:
+            for location in case['locations']:
+                for block in blocks:
+                    numbers = [limits.Limit(variable, investment_type,
+                                            location, x) for x in block]
+                    if(None not in numbers):
+                        rows.append((variable, investment_type, location,
+                                     block[0], sum(numbers)))
+    return pd.DataFrame(rows, columns=INVESTMENT_LIMIT_COLUMNS)
+
+
+def AggregatedCase(case, blocks):
+    # Copy of the case with one time period (the first) per block
+    aggregated_case = dict(case)
+    aggregated_case['time_periods'] = [block[0] for block in blocks]
+    aggregated_case['investment_limits'] = AggregatedLimits(case, blocks)
+    block_of = {x: block for block in blocks for x in block}
+    for name in TIME_PARAMETER_NAMES:
+        if(not isinstance(case[name], dict)):
+            continue
+        if(name in WORST_CASE):
+            values = {}
+            for (key, value) in case[name].items():
+                values.setdefault(key[:-1] + (block_of[key[-1]][0],), [])\
+                    .append(value)
+            aggregated_case[name] = {key: WORST_CASE[name](x)
+                                     for (key, x) in values.items()}
+        else:
+            aggregated_case[name] = {key: value for (key, value)
+                                     in case[name].items()
+                                     if block_of[key[-1]][0] == key[-1]}
+    return aggregated_case
+
+
+def ExpandInvestments(investments, blocks, investment_limits=None):
+    # Investments of the aggregated model (variable name -> {index: number})
+    # on the full horizon: made in the first period of the block, or, when
+    # that is more than the limit of the period (see AggregatedLimits), as
+    # early in the block as the limits of its periods allow
+    # investment_limits: limits table of the full case
+    limits = InvestmentLimits(investment_limits)
+    expanded = {}
+    for (name, values) in investments.items():
+        expanded[name] = {}
+        for (index, value) in values.items():
+            block = next(x for x in blocks if x[0] == index[-1])
+            remaining = value or 0
+            for time_period in block:
+                key = index[:-1] + (time_period,)
+                limit = limits.IndexLimit(name, key)
+                number = remaining if limit is None else \
+                    min(remaining, limit)
+                expanded[name][key] = number
+                remaining -= number
+    return expanded
+
+
+def RepairInvestments(case, investments, with_or_without_storage="With",
+                      solver_name='auto', time_limit=100, formulation=None,
+                      profile=DEFAULT_PROFILE):
+    # Solve the full horizon with the expanded investments as lower bounds
+    # and as warm start, so that only the investments that are missing in
+    # some period of a block (e.g. because storage content moves between
+    # blocks instead of periods) are added. Returns the investments, the
+    # objective and the termination condition.
+    from pyomo.environ import value
+    model = BuildModel(case, with_or_without_storage,
+                       **(formulation or {'sparse': True}))
+    for (name, values) in investments.items():
+        variable = getattr(model.model, name)
+        for (index, number) in values.items():
+            if(index in variable):
+                variable[index].setlb(round(number))
+    results = RunningLocalServer(model.model, solver_name, time_limit,
+                                 tee=False, warm_start=investments,
+                                 profile=profile)
+    return InvestmentSolution(model.model), \
+        value(model.model.Cost, exception=False), \
+        str(results.solver.termination_condition)
+
+
+def SolveAggregated(case, n_periods=None, max_distance=None,
+                    with_or_without_storage="With", solver_name='auto',
+                    time_limit=100, formulation=None, profile=DEFAULT_PROFILE,
+                    repair=True, reference=False):
+    # case: see case_imes.BuildCaseData
+    # repair: make the expanded investments feasible for every period (see
+    # RepairInvestments)
+    # reference: also solve the full horizon, for the objective error
+    # Returns the investments on the full horizon (variable name -> {index:
+    # number}) and a report
+    from pyomo.environ import value
+
+    blocks = PeriodBlocks(case, n_periods, max_distance)
+    start = time.perf_counter()
+    model = BuildModel(AggregatedCase(case, blocks), with_or_without_storage,
+                       **(formulation or {'sparse': True}))
+    results = RunningLocalServer(model.model, solver_name, time_limit,
+                                 tee=False, profile=profile)
+    report = {'blocks': blocks,
+              'termination_condition':
+                  str(results.solver.termination_condition),
+              'objective': value(model.model.Cost, exception=False),
+              'seconds': time.perf_counter() - start}
+    if(report['objective'] is None):
+        raise RuntimeError("Aggregated model not solved (%s)"
+                           % report['termination_condition'])
+    investments = ExpandInvestments(InvestmentSolution(model.model), blocks,
+                                    case.get('investment_limits'))
+    report['expanded_objective'] = PlanCost(case, investments)
+
+    if(repair):
+        start = time.perf_counter()
+        (investments, report['repaired_objective'],
+         report['repaired_termination_condition']) = RepairInvestments(
+            case, investments, with_or_without_storage, solver_name,
+            time_limit, formulation, profile)
+        report['repair_seconds'] = time.perf_counter() - start
+    if(reference):
+        start = time.perf_counter()
+        model = BuildModel(case, with_or_without_storage,
+                           **(formulation or {'sparse': True}))
+        RunningLocalServer(model.model, solver_name, time_limit, tee=False,
+                           profile=profile)
+        report['reference_objective'] = value(model.model.Cost,
+                                              exception=False)
+        report['reference_seconds'] = time.perf_counter() - start
+        objective = report.get('repaired_objective',
+                               report['expanded_objective'])
+        if(report['reference_objective'] and objective is not None):
+            report['objective_error'] = \
+                (objective - report['reference_objective']) / \
+                report['reference_objective']
+    return investments, report
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Compiled model artifacts. A built model is written once as a gzipped MPS
+file with a symbol map (column name -> variable name and index), and can be
+solved from that file again and again, e.g. with other solver options,
+without importing Pyomo or building the model. The solution is read back
+into {index: value} dicts per variable, which export_imes writes or turns
+into DataFrames.
+
+An artifact is a directory with:
+    model.mps.gz  the model (fixed variables are constants in it)
+    symbols.json  {column name: [variable name, index]}
+
+Solvers: Gurobi (gurobipy), HiGHS (highspy) or CBC (the cbc executable);
+'auto' takes the first one that is installed, in the order of
+SOLVER_PREFERENCE. The options are the generic options of solvers_imes.
+
+Usage:
+    WriteArtifact(model.model, 'artifacts/95%_red')
+    values, report = SolveArtifact('artifacts/95%_red', 'auto', 'exact',
+                                   time_limit=600)
+    frames = ArtifactFrames(values)
+"""
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import weakref
+
+from export_imes import ValuesFrame, VARIABLE_COLUMNS, PARAMETER_COLUMNS
+from solvers_imes import (DEFAULT_PROFILE, SOLVER_PREFERENCE, SolverBackend,
+                          SolverOptions, ProfileOptions)
+
+ARTIFACT_MODEL_FILE = 'model.mps.gz'
+ARTIFACT_SYMBOLS_FILE = 'symbols.json'
+
+
+def WriteArtifact(model, directory):
+    # Write a built Pyomo model (the .model of math_prog_imes.Model) as an
+    # artifact; returns the directory
+    from pyomo.environ import Var
+    os.makedirs(directory, exist_ok=True)
+    mps_file = os.path.join(directory, 'model.mps')
+    _, symbol_map_id = model.write(mps_file, format='mps')
+    symbol_map = model.solutions.symbol_map[symbol_map_id]
+    symbols = {}
+    for (symbol, variable) in symbol_map.bySymbol.items():
+        # Symbols of the columns only (not of the rows and the objective)
+        if(isinstance(variable, weakref.ReferenceType)):
+            variable = variable()
+        if(variable is None or not hasattr(variable, 'parent_component') or
+           variable.parent_component().ctype is not Var):
+            continue
+        index = variable.index()
+        symbols[symbol] = [variable.parent_component().name,
+                           list(index) if isinstance(index, tuple)
+                           else index]
+    with open(mps_file, 'rb') as f, \
+            gzip.open(os.path.join(directory, ARTIFACT_MODEL_FILE),
+                      'wb') as g:
+        shutil.copyfileobj(f, g)
+    os.remove(mps_file)
+    with open(os.path.join(directory, ARTIFACT_SYMBOLS_FILE), 'w') as f:
+        json.dump(symbols, f)
+    return directory
+
+
+def _SolveHighs(mps_file, options, tee):
+    import highspy
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', bool(tee))
+    highs.readModel(mps_file)
+    for (name, value) in options.items():
+        highs.setOptionValue(name, value)
+    highs.run()
+    status = highs.modelStatusToString(highs.getModelStatus())
+    info = highs.getInfo()
+    names = highs.getLp().col_names_
+    values = highs.getSolution().col_value
+    solution = dict(zip(names, values)) if info.primal_solution_status \
+        else {}
+    return ({'Optimal': 'optimal', 'Time limit reached': 'maxTimeLimit',
+             'Infeasible': 'infeasible'}.get(status, status),
+            info.objective_function_value if solution else None,
+            info.mip_dual_bound, solution)
+
+
+def _SolveGurobi(mps_file, options, tee):
+    import gurobipy
+    model = gurobipy.read(mps_file)
+    model.Params.OutputFlag = int(bool(tee))
+    for (name, value) in options.items():
+        model.setParam(name, value)
+    model.optimize()
+    status = {gurobipy.GRB.OPTIMAL: 'optimal',
+              gurobipy.GRB.TIME_LIMIT: 'maxTimeLimit',
+              gurobipy.GRB.INFEASIBLE: 'infeasible'}.get(model.Status,
+                                                         str(model.Status))
+    solution = {}
+    if(model.SolCount > 0):
+        solution = {x.VarName: x.X for x in model.getVars()}
+    return (status, model.ObjVal if solution else None,
+            model.ObjBound if model.IsMIP else model.ObjVal, solution)
+
+
+def _SolveCbc(mps_file, options, tee):
+    # cbc <model> -<option> <value> ... -solve -solution <file>
+    with tempfile.TemporaryDirectory() as directory:
+        model_file = os.path.join(directory, 'model.mps')
+        with gzip.open(mps_file, 'rb') as f, open(model_file, 'wb') as g:
+            shutil.copyfileobj(f, g)
+        solution_file = os.path.join(directory, 'solution.txt')
+        command = ['cbc', model_file]
+        for (name, value) in options.items():
+            command += ['-' + name, str(value)]
+        command += ['-solve', '-solution', solution_file]
+        subprocess.run(command, check=True,
+                       stdout=None if tee else subprocess.DEVNULL)
+        with open(solution_file) as f:
+            lines = f.read().splitlines()
+    # First line: status and objective, then: number name value reduced cost
+    status = lines[0].split(' - ')[0].strip().lower()
+    objective = float(lines[0].rsplit(' ', 1)[-1]) \
+        if 'objective value' in lines[0] else None
+    solution = {}
+    for line in lines[1:]:
+        parts = line.replace('**', '').split()
+        if(len(parts) >= 3):
+            solution[parts[1]] = float(parts[2])
+    return ({'optimal': 'optimal', 'stopped on time': 'maxTimeLimit',
+             'infeasible': 'infeasible'}.get(status, status),
+            objective, None, solution)
+
+
+ARTIFACT_SOLVERS = {'gurobi': _SolveGurobi, 'highs': _SolveHighs,
+                    'cbc': _SolveCbc}
+
+
+def ArtifactSolver(solver_name='auto'):
+    # Backend that solves artifacts: the backend of solver_name, or for
+    # 'auto' the first installed backend of SOLVER_PREFERENCE
+    if(solver_name not in (None, 'auto')):
+        backend = SolverBackend(solver_name)
+        if(backend not in ARTIFACT_SOLVERS):
+            raise ValueError("Artifacts can not be solved with %r, use one "
+                             "of %s" % (solver_name, list(ARTIFACT_SOLVERS)))
+        return backend
+    for backend in [SolverBackend(x) for x in SOLVER_PREFERENCE]:
+        if(backend == 'cbc'):
+            if(shutil.which('cbc')):
+                return backend
+            continue
+        try:
+            __import__({'gurobi': 'gurobipy', 'highs': 'highspy'}[backend])
+            return backend
+        except ImportError:
+            pass
+    raise RuntimeError("None of the artifact solvers %s is installed"
+                       % list(ARTIFACT_SOLVERS))
+
+
+def SolveArtifact(directory, solver_name='auto', profile=DEFAULT_PROFILE,
+                  tee=False, **options):
+    # Solve an artifact (see WriteArtifact)
+    # profile and options (time_limit, mip_gap, ...): see solvers_imes
+    # Returns the values (variable name -> {index: value}) and a report
+    backend = ArtifactSolver(solver_name)
+    with open(os.path.join(directory, ARTIFACT_SYMBOLS_FILE)) as f:
+        symbols = json.load(f)
+    start = time.perf_counter()
+    termination_condition, objective, lower_bound, solution = \
+        ARTIFACT_SOLVERS[backend](
+            os.path.join(directory, ARTIFACT_MODEL_FILE),
+            SolverOptions(backend, **ProfileOptions(profile, **options)), tee)
+    report = {'solver': backend,
+              'termination_condition': termination_condition,
+              'objective': objective, 'lower_bound': lower_bound,
+              'seconds': time.perf_counter() - start}
+
+    values = {}
+    for (symbol, (name, index)) in symbols.items():
+        if(isinstance(index, list)):
+            index = tuple(index)
+        values.setdefault(name, {})[index] = solution.get(symbol)
+    return values, report
+
+
+def ArtifactFrames(values, nonzero=False):
+    # Tidy DataFrame per variable (see export_imes.ValuesFrame); variables
+    # without known index columns get index_0, index_1, ...
+    frames = {}
+    for (name, variable_values) in values.items():
+        columns = VARIABLE_COLUMNS.get(name) or PARAMETER_COLUMNS.get(name)
+        if(columns is None):
+            key = next(iter(variable_values), None)
+            columns = ['index_%d' % i for i in
+                       range(len(key) if isinstance(key, tuple) else 1)]
+        frames[name] = ValuesFrame(variable_values, columns, nonzero)
+    return frames
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Build/solve benchmark on synthetic cases (see synthetic_case_imes): for every
+number of locations and time periods the case workbook is generated, and the
+phases load, case, build (sets, parameters, variables, objective,
+constraints), solve and export are recorded with
+instrumentation_imes.PhaseRecorder (time, peak resident memory and model
+size, nonzeros with --count-nonzeros). The export is the export of the
+runner (export_imes.WriteWorkbook and WriteResults). The results go to a
+json file, which can be compared with the results of an earlier run to catch
+performance regressions.
+
+Usage: python benchmark_imes.py --locations 21 100 --time-periods 5 17
+           [--solve appsi_highs] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+from case_imes import LoadCaseTables, BuildCaseData, SET_NAMES, \
+    PARAMETER_NAMES
+from instrumentation_imes import PhaseRecorder
+from synthetic_case_imes import WriteSyntheticCase
+
+RESULTS_FILE = 'benchmark_results.json'
+
+# Phases of which the time is compared with the baseline
+COMPARED_PHASES = ['load', 'case', 'sets', 'parameters', 'variables',
+                   'objective', 'constraints', 'solve', 'export']
+
+
+def BenchmarkCase(n_locations, n_time_periods, data_dir='./data/benchmark',
+                  solver_name=None, time_limit=100, export=False,
+                  with_or_without_storage="With", formulation=None,
+                  count_nonzeros=False, seed=0):
+    # Run all phases for one case size; returns the result record
+    # The build phases (Model.Initialize*) and the solve (RunningLocalServer)
+    # are recorded by the active recorder, with a sub-phase per constraint
+    # block
+    db_file = os.path.join(data_dir, 'IMES_%dnode_%dperiod_synthetic.xlsx'
+                           % (n_locations, n_time_periods))
+    if(not os.path.exists(db_file)):
+        WriteSyntheticCase(db_file, n_locations, n_time_periods, seed)
+    formulation = formulation or {}
+    recorder = PhaseRecorder(count_nonzeros).Activate()
+    try:
+        result = _RunPhases(recorder, db_file, data_dir, solver_name,
+                            time_limit, export, with_or_without_storage,
+                            formulation)
+    finally:
+        recorder.Deactivate()
+    result.update({'locations': n_locations, 'time_periods': n_time_periods,
+                   'seed': seed, 'formulation': formulation,
+                   'storage': with_or_without_storage,
+                   'phases': recorder.Report()['phases']})
+    return result
+
+
+def _RunPhases(recorder, db_file, data_dir, solver_name, time_limit, export,
+               with_or_without_storage, formulation):
+    from math_prog_imes import Model
+
+    with recorder.Phase('load'):
+        tables = LoadCaseTables(db_file)
+    with recorder.Phase('case'):
+        case = BuildCaseData(tables)
+    model = Model(**formulation)
+    model.InitializeSets(*[case[x] for x in SET_NAMES])
+    model.CreateParametersFromDictionaries(
+        *[case[x] for x in PARAMETER_NAMES])
+    model.InitializeVariables()
+    model.InitializeObjective()
+    model.InitializeConstraints(with_or_without_storage)
+
+    result = {'edges': len(case['edges']),
+              'variables': model.model.nvariables(),
+              'constraints': model.model.nconstraints()}
+    if(solver_name is not None):
+        from pyomo.environ import value
+        from pyomo_helper_imes import RunningLocalServer
+        from export_imes import WriteWorkbook, WriteResults
+        results = RunningLocalServer(model.model, solver_name, time_limit,
+                                     tee=False)
+        result['termination_condition'] = \
+            str(results.solver.termination_condition)
+        result['objective'] = value(model.model.Cost, exception=False)
+        if(export and result['objective'] is not None):
+            with recorder.Phase('export'):
+                WriteWorkbook(model.model,
+                              os.path.join(data_dir, 'benchmark_export.xlsx'))
+                WriteResults(model.model,
+                             os.path.join(data_dir, 'benchmark_export'))
+    return result
+
+
+def CompareResults(results, baseline, tolerance=0.25, min_seconds=0.1):
+    # Phases that are more than tolerance (fraction) slower than in the
+    # baseline, for the cases that are in both; phases faster than
+    # min_seconds in the baseline are ignored (timing noise)
+    def Key(result):
+        return (result['locations'], result['time_periods'],
+                json.dumps(result['formulation'], sort_keys=True),
+                result['storage'])
+    baseline_phases = {Key(x): {y['phase']: y['seconds'] for y in x['phases']}
+                       for x in baseline}
+    regressions = []
+    for result in results:
+        old = baseline_phases.get(Key(result))
+        if(old is None):
+            continue
+        for phase in result['phases']:
+            seconds = old.get(phase['phase'])
+            if(phase['phase'] not in COMPARED_PHASES or seconds is None or
+               seconds < min_seconds):
+                continue
+            if(phase['seconds'] > (1 + tolerance) * seconds):
+                regressions.append({'locations': result['locations'],
+                                    'time_periods': result['time_periods'],
+                                    'phase': phase['phase'],
+                                    'baseline_seconds': seconds,
+                                    'seconds': phase['seconds']})
+    return regressions
+
+
+def RunBenchmark(locations=(21, 100), time_periods=(5, 17), **kwargs):
+    results = []
+    for n_locations in locations:
+        for n_time_periods in time_periods:
+            print("Benchmarking %d locations, %d time periods"
+                  % (n_locations, n_time_periods))
+            result = BenchmarkCase(n_locations, n_time_periods, **kwargs)
+            for phase in result['phases']:
+                # Not the sub-phases (constraint blocks)
+                if('/' not in phase['phase']):
+                    print('  %-12s %10.2f s' % (phase['phase'],
+                                                phase['seconds']))
+            results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--locations', nargs='*', type=int, default=[21, 100])
+    parser.add_argument('--time-periods', nargs='*', type=int, default=[5, 17])
+    parser.add_argument('--storage', default="With")
+    parser.add_argument('--sparse', action='store_true')
+    parser.add_argument('--cumulative-capacity', action='store_true')
+    parser.add_argument('--storage-formulation', default="History")
+    parser.add_argument('--solve', dest='solver_name', default=None,
+                        help='Solver name (default: no solve)')
+    parser.add_argument('--time-limit', type=float, default=100)
+    parser.add_argument('--export', action='store_true')
+    parser.add_argument('--count-nonzeros', action='store_true',
+                        help='Count the nonzeros of every phase (about '
+                        'doubles the build time)')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = RunBenchmark(
+        args.locations, args.time_periods, solver_name=args.solver_name,
+        time_limit=args.time_limit, export=args.export,
+        with_or_without_storage=args.storage,
+        formulation={'sparse': args.sparse,
+                     'cumulative_capacity': args.cumulative_capacity,
+                     'storage_formulation': args.storage_formulation},
+        count_nonzeros=args.count_nonzeros)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print("Written %s" % args.output)
+
+    if(args.baseline is not None):
+        with open(args.baseline) as f:
+            regressions = CompareResults(results, json.load(f),
+                                         args.tolerance)
+        for x in regressions:
+            print("Regression: %d locations, %d time periods, %s: %.2f s "
+                  "(baseline %.2f s)" % (x['locations'], x['time_periods'],
+                                         x['phase'], x['seconds'],
+                                         x['baseline_seconds']))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Benchmark of the solver backends: solves the case (by default the 21 node
+case) with every installed solver and every profile, and compares the solve
+time, the objective and the bound. Solvers that are not installed are
+skipped.
+
+Usage: python benchmark_solvers_imes.py [--db-file case.xlsx]
+           [--solvers gurobi appsi_highs cbc] [--profiles fast-approx exact]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from case_imes import DB_FILE, LoadCaseTables, BuildCaseData, BuildModel
+from pyomo_helper_imes import RunningLocalServer
+from solvers_imes import SOLVER_PREFERENCE, SOLVER_PROFILES, AvailableSolver
+
+
+def BenchmarkSolvers(db_file=DB_FILE, solver_names=SOLVER_PREFERENCE,
+                     profiles=tuple(SOLVER_PROFILES), time_limit=100,
+                     threads=None, with_or_without_storage="With",
+                     formulation=None):
+    # One row per solver and profile
+    from pyomo.environ import value
+    case = BuildCaseData(LoadCaseTables(db_file))
+    rows = []
+    for solver_name in solver_names:
+        try:
+            AvailableSolver([solver_name])
+        except RuntimeError:
+            print("Skipping %s (not available)" % solver_name)
+            continue
+        for profile in profiles:
+            print("Solving with %s, profile %s" % (solver_name, profile))
+            model = BuildModel(case, with_or_without_storage,
+                               **(formulation or {'sparse': True}))
+            start = time.perf_counter()
+            results = RunningLocalServer(model.model, solver_name,
+                                         time_limit, threads=threads,
+                                         tee=False, profile=profile)
+            rows.append({'solver': solver_name, 'profile': profile,
+                         'termination_condition':
+                             str(results.solver.termination_condition),
+                         'objective': value(model.model.Cost,
+                                            exception=False),
+                         'lower_bound': results.problem.lower_bound,
+                         'seconds': time.perf_counter() - start})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db-file', default=DB_FILE)
+    parser.add_argument('--solvers', nargs='*', default=SOLVER_PREFERENCE)
+    parser.add_argument('--profiles', nargs='*', choices=list(SOLVER_PROFILES),
+                        default=list(SOLVER_PROFILES))
+    parser.add_argument('--time-limit', type=float, default=100)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--storage', default="With")
+    parser.add_argument('--output', default='benchmark_solvers.csv')
+    args = parser.parse_args()
+
+    results = BenchmarkSolvers(args.db_file, args.solvers, args.profiles,
+                               args.time_limit, args.threads, args.storage)
+    results.to_csv(args.output, index=False)
+    print(results.to_string(index=False))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Benchmark of the storage formulations: builds the model with the "History"
+and the "StateOfCharge" storage formulation for an increasing number of time
+periods and compares the number of nonzeros in the storage constraints.
+Only the model structure matters here, so all parameters are constants, and
+the cumulative capacity formulation is used so that the storage history is
+the only part that differs.
+
+Usage: python benchmark_storage_imes.py [number of locations]
+"""
+import sys
+import time
+
+from math_prog_imes import Model
+from pyomo_helper_imes import CountNonzeros
+
+STORAGE_CONSTRAINTS = ['MaxAmountStoredIn', 'MaxAmountStoredOut',
+                       'StorageLevelBalance', 'MinimumStoredConstraint',
+                       'MaximumStoredConstraint']
+
+
+def BuildStructureModel(n_locations, n_time_periods, storage_formulation):
+    locations = ['Node_%d' % (i + 1) for i in range(n_locations)]
+    edges = [(locations[i], locations[i + 1])
+             for i in range(n_locations - 1)]
+    arcs = edges + [(edge[1], edge[0]) for edge in edges]
+    time_periods = [2018 + 2 * i for i in range(n_time_periods)]
+
+    model = Model(sparse=True, cumulative_capacity=True,
+                  storage_formulation=storage_formulation)
+    model.InitializeSets(locations, ['Electricity', 'Gas', 'Heat'],
+                         ['CHP', 'HP', 'P2G'], ['Solar', 'Wind'], edges,
+                         arcs, time_periods)
+    model.CreateParametersFromDictionaries(1, 1, 1, 1, 1, 1, 1, 0.5, 1, 0.9,
+                                           0, 1, 0.01, 1, 1, 0, 0, 0, 0)
+    model.InitializeVariables()
+    model.InitializeObjective()
+    model.InitializeConstraints("With")
+    return model
+
+
+if __name__ == '__main__':
+    n_locations = int(sys.argv[1]) if len(sys.argv) > 1 else 21
+    print('%6s %14s %12s %10s' % ('T', 'formulation', 'nonzeros', 'build [s]'))
+    for n_time_periods in [5, 9, 17, 33]:
+        for storage_formulation in ["History", "StateOfCharge"]:
+            start = time.perf_counter()
+            model = BuildStructureModel(n_locations, n_time_periods,
+                                        storage_formulation)
+            build_time = time.perf_counter() - start
+            nonzeros = CountNonzeros(model.model, STORAGE_CONSTRAINTS)
+            print('%6d %14s %12d %10.2f' % (n_time_periods,
+                                            storage_formulation,
+                                            sum(nonzeros.values()),
+                                            build_time))
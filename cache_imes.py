@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Local cache of solved models, keyed by the content hash of everything that
+goes into the solve: the sets and parameters of the case, the storage
+option, the formulation options and the solver settings. A rerun with the
+same inputs (e.g. to write testresults.xlsx again, or after a change of the
+code that does not change the model) restores the values of the variables
+and parameters from the cache instead of building and solving the model.
+
+The entries are pickle files in the cache directory. When the directory
+gets larger than max_bytes, the least recently used entries are removed.
+Entries are only written for solves that found a solution.
+
+The key does not depend on the code; change CACHE_VERSION when a change of
+the model formulation makes the cached solutions invalid, or bypass the
+cache (bypass=True solves again and replaces the entry).
+
+Usage:
+    model, entry = CachedSolve(case, "With", {'sparse': True}, 'auto', 100)
+    WriteResults(entry['values'], 'testresults')
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from export_imes import ComponentValues, ResultNames
+from instrumentation_imes import Annotate
+from solvers_imes import DEFAULT_PROFILE
+
+# Part of every key; change it to invalidate all cached solutions
+CACHE_VERSION = 1
+
+RESULT_CACHE_DIR = './data/.cache/results'
+
+# Size of the cache directory above which entries are removed
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def _Canonical(x):
+    # JSON-able form of the case data in which equal inputs are equal:
+    # numbers as floats (1 == 1.0, numpy or not), dicts sorted by key,
+    # DataFrames as columns and rows
+    if(hasattr(x, 'to_dict') and hasattr(x, 'columns')):
+        return {'columns': [str(c) for c in x.columns],
+                'rows': _Canonical(x.values.tolist())}
+    if(isinstance(x, dict)):
+        items = [(_Canonical(key), _Canonical(value))
+                 for (key, value) in x.items()]
+        return sorted(items, key=lambda item: json.dumps(item[0]))
+    if(isinstance(x, (list, tuple, set, frozenset))):
+        values = [_Canonical(value) for value in x]
+        if(isinstance(x, (set, frozenset))):
+            values.sort(key=json.dumps)
+        return values
+    if(isinstance(x, bool) or x is None):
+        return x
+    try:
+        return repr(float(x))
+    except (TypeError, ValueError):
+        return str(x)
+
+
+def CacheKey(case, with_or_without_storage="With", formulation=None,
+             solver_settings=None):
+    # Content hash of the inputs of a solve
+    # case: see case_imes.BuildCaseData (sets and parameters)
+    # solver_settings: dict of the solver name and options
+    inputs = {'version': CACHE_VERSION, 'case': case,
+              'storage': with_or_without_storage,
+              'formulation': formulation or {},
+              'solver': solver_settings or {}}
+    return hashlib.sha256(json.dumps(_Canonical(inputs)).encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory=RESULT_CACHE_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def EntryFile(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def Get(self, key):
+        # Cached entry, None without one; the entry becomes the most
+        # recently used
+        entry_file = self.EntryFile(key)
+        try:
+            with open(entry_file, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(entry_file)
+        return entry
+
+    def Put(self, key, entry):
+        # Write to a temporary file first, so that an interrupted run never
+        # leaves a half-written entry behind
+        entry_file = self.EntryFile(key)
+        with open(entry_file + '.tmp', 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(entry_file + '.tmp', entry_file)
+        self.Evict()
+
+    def Evict(self):
+        # Remove the least recently used entries until the cache fits in
+        # max_bytes
+        entries = []
+        for name in os.listdir(self.directory):
+            if(name.endswith('.pkl')):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(x[1] for x in entries)
+        for (_, size, name) in sorted(entries):
+            if(total <= self.max_bytes):
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def Clear(self):
+        for name in os.listdir(self.directory):
+            if(name.endswith('.pkl')):
+                os.remove(os.path.join(self.directory, name))
+
+
+def CachedSolve(case, with_or_without_storage="With", formulation=None,
+                solver_name='auto', time_limit=100, profile=DEFAULT_PROFILE,
+                cache=None, bypass=False, tee=True, **options):
+    # Build and solve the model of the case (see case_imes.BuildModel and
+    # pyomo_helper_imes.RunningLocalServer), or restore the solution from
+    # the cache
+    # cache: ResultCache (default: one in RESULT_CACHE_DIR)
+    # bypass: do not use a cached solution (the new one is cached)
+    # Returns the model (None on a cache hit) and the entry: dict with
+    # termination_condition, objective, lower_bound, values (name ->
+    # {index: value} of all variables and parameters, see export_imes) and
+    # hit
+    from pyomo.environ import value
+    from case_imes import BuildModel
+    from pyomo_helper_imes import RunningLocalServer
+    from solvers_imes import SolverName
+
+    if(cache is None):
+        cache = ResultCache()
+    formulation = formulation or {'sparse': True}
+    solver_name = SolverName(solver_name)
+    key = CacheKey(case, with_or_without_storage, formulation,
+                   dict(options, solver_name=solver_name,
+                        time_limit=time_limit, profile=profile))
+    if(not bypass):
+        entry = cache.Get(key)
+        if(entry is not None):
+            Annotate(cache='hit', cache_key=key)
+            entry['hit'] = True
+            return None, entry
+
+    model = BuildModel(case, with_or_without_storage, **formulation)
+    results = RunningLocalServer(model.model, solver_name, time_limit,
+                                 tee=tee, profile=profile, **options)
+    entry = {'termination_condition':
+                 str(results.solver.termination_condition),
+             'objective': value(model.model.Cost, exception=False),
+             'lower_bound': results.problem.lower_bound,
+             'time': time.time()}
+    if(entry['objective'] is not None):
+        entry['values'] = {name: ComponentValues(model.model, name)
+                           for name in ResultNames(model.model)}
+        cache.Put(key, entry)
+    Annotate(cache='bypass' if bypass else 'miss', cache_key=key)
+    entry['hit'] = False
+    return model, entry
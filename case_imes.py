@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Case data of the IMES model: turns the sheets of the case workbook into the
+sets and parameter dictionaries of math_prog_imes.Model, for one supply
+scenario and weather factor. This is the data part of Runner_imes.py as
+functions, so that sweeps and other drivers can build many cases.
+"""
+from ingest_imes import CaseWorkbook, SHEET_NAMES, OPTIONAL_SHEET_NAMES
+from costs_imes import DiscountedCostParameters, DEFAULT_DEVELOPMENT_RATES
+from investment_limits_imes import DEFAULT_INVESTMENT_LIMITS
+
+DB_FILE = './data/IMES_21node_case_data.xlsx'
+
+# Columns of the Supply sheet that are not scenario columns
+SUPPLY_INDEX_COLUMNS = ['iProduct', 'iLocation', 'iTimeSlot']
+
+# Names of the sets, in the argument order of Model.InitializeSets
+SET_NAMES = ['locations', 'energy_carriers', 'energy_converters',
+             'supply_types', 'edges', 'arcs', 'time_periods']
+
+# Names of the parameters, in the argument order of
+# Model.CreateParametersFromDictionaries
+PARAMETER_NAMES = ['network_costs', 'max_flow_line',
+                   'supply_investment_costs', 'supply_external_factor',
+                   'max_energy_supplied', 'converter_investment_costs',
+                   'max_converted', 'conversion_efficiencies',
+                   'storage_costs', 'storage_losses', 'min_stored',
+                   'max_stored', 'loss_factor', 'demand', 'amount_given',
+                   'earlier_line_investment_made',
+                   'earlier_supply_investment_made',
+                   'earlier_converter_investment_made',
+                   'earlier_storage_investment_made', 'investment_limits']
+
+
+def LoadCaseTables(db_file=DB_FILE, sheet_names=SHEET_NAMES):
+    # All sheets of the case workbook, read through the columnar cache (and
+    # the optional sheets that the workbook has)
+    return CaseWorkbook(db_file).Load(
+        sheet_names, optional_sheet_names=OPTIONAL_SHEET_NAMES)
+
+
+def SupplyScenarioColumns(df_supply):
+    # The CO2 reduction scenario columns of the Supply sheet (e.g. '95%_red')
+    return [x for x in df_supply.columns if x not in SUPPLY_INDEX_COLUMNS]
+
+
+def BuildCaseData(tables, supply_scenario='95%_red', weather_factor=1.0,
+                  discount_rate=0.045, starting_time_period=2018,
+                  development_rates=DEFAULT_DEVELOPMENT_RATES):
+    # tables: sheet name -> DataFrame, see LoadCaseTables
+    # Returns a dict with the sets (SET_NAMES) and the parameters
+    # (PARAMETER_NAMES) of the case.
+    df_network = tables['Network']
+    df_supply_units = tables['SupplyUnits']
+    df_storage_units = tables['StorageUnits']
+    case = {}
+
+    # Making the SetsLists
+    case['locations'] = locations = list(tables['Locations'].Locations)
+    case['energy_carriers'] = energy_carriers = ["Electricity", "Gas", "Heat"]
+    case['energy_converters'] = ["CHP", "HP", "P2G"]
+    case['supply_types'] = ["Solar", "Wind"]  # add gas here? not needed?
+    case['time_periods'] = time_periods = \
+        list(tables['TimePeriods'].TimeSlot)
+
+    # Making the edges and arcs from the electricity network costs
+    edges = []
+    arcs = []
+    for x in df_network.set_index(['Type', 'LocationFrom', 'LocationTo'])\
+            .to_dict()['Costs']:
+        if(x[0] == 'Electricity'):
+            edges.append((x[1], x[2]))
+            arcs.append((x[1], x[2]))
+            arcs.append((x[2], x[1]))
+    case['edges'] = edges
+    case['arcs'] = arcs
+
+    # Network, supply, converter and storage costs, discounted with the
+    # discount rate and the development rates (network costs on the edges
+    # only, where lines can be built)
+    discounted_costs = DiscountedCostParameters(
+        df_network, df_supply_units, tables['ConversionUnits'],
+        df_storage_units, energy_carriers, locations, time_periods,
+        starting_time_period, discount_rate, development_rates, edges)
+    case['network_costs'] = discounted_costs['network_costs']
+    case['supply_investment_costs'] = \
+        discounted_costs['supply_investment_costs']
+    case['converter_investment_costs'] = \
+        discounted_costs['converter_investment_costs']
+    case['storage_costs'] = discounted_costs['storage_investment_costs']
+
+    # Maximum flow on a line and line losses
+    case['max_flow_line'] = tables['MaxFlow'].set_index(['Type'])\
+        .to_dict()['MaxFlowLine']
+    case['loss_factor'] = tables['MaxFlow'].set_index(['Type'])\
+        .to_dict()['LossFactor']
+
+    # Maximum energy supplied
+    case['max_energy_supplied'] = df_supply_units\
+        .set_index(['Type', 'SupplyType']).to_dict()['MaxSupply']
+
+    # Maximum energy converted and conversion efficiencies
+    case['max_converted'] = tables['MaxConverted']\
+        .set_index(['Type', 'ConversionUnit']).to_dict()['MaxConverted']
+    case['conversion_efficiencies'] = tables['ConversionEfficiencies']\
+        .set_index(['Type1', 'Type2', 'ConversionType'])\
+        .to_dict()['Efficiency']
+
+    # Storage losses, minimum and maximum storage level
+    storage_units = df_storage_units.set_index(['StorageType']).to_dict()
+    case['storage_losses'] = storage_units['StockDrain']
+    case['min_stored'] = storage_units['MinStorageLevel']
+    case['max_stored'] = storage_units['MaxStorageLevel']
+
+    # The demand of each location and energy type. Each location has a
+    # certain demand percentage of the total demand, which changes over the
+    # years.
+    case['demand'] = tables['Demand']\
+        .set_index(['Type', 'Location', 'TimePeriod']).to_dict()['Demand']
+
+    # Amount of supply at the nodes for the CO2 reduction scenario
+    supply_scenario_read = tables['Supply']\
+        .set_index(SUPPLY_INDEX_COLUMNS).to_dict()[supply_scenario]
+    amount_given = {}
+    for key, value in supply_scenario_read.items():
+        if(key[0] == 'Gas'):
+            amount_given[key] = value
+            amount_given['Electricity', key[1], key[2]] = 0
+            amount_given['Heat', key[1], key[2]] = 0
+    case['amount_given'] = amount_given
+
+    # Solar and wind supply factors at the nodes (weather scenarios), scaled
+    # with the weather factor
+    case['supply_external_factor'] = {
+        key: value * weather_factor
+        for (key, value) in supply_scenario_read.items()
+        if key[0] in ('Solar', 'Wind')}
+
+    # Investments that were already made before the first time period
+    # (used when each period is solved separately, zero otherwise)
+    case['earlier_line_investment_made'] = 0
+    case['earlier_supply_investment_made'] = 0
+    case['earlier_converter_investment_made'] = 0
+    case['earlier_storage_investment_made'] = 0
+
+    # Maximum number of investments (InvestmentLimits sheet, see
+    # investment_limits_imes); change case['investment_limits'] to change
+    # the limits per scenario
+    case['investment_limits'] = tables.get('InvestmentLimits',
+                                           DEFAULT_INVESTMENT_LIMITS)
+    return case
+
+
+def BuildModel(case, with_or_without_storage="With", model_class=None,
+               **formulation):
+    # Initialize the sets, parameters, variables, objective and constraints
+    # of a model for the case. formulation is passed to the model class
+    # (e.g. sparse=True); model_class defaults to math_prog_imes.Model.
+    if(model_class is None):
+        from math_prog_imes import Model
+        model_class = Model
+    model = model_class(**formulation)
+    model.InitializeSets(*[case[x] for x in SET_NAMES])
+    model.CreateParametersFromDictionaries(*[case[x]
+                                             for x in PARAMETER_NAMES])
+    model.InitializeVariables()
+    model.InitializeObjective()
+    model.InitializeConstraints(with_or_without_storage)
+    return model
+
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Discounted cost parameters for the IMES model, computed as numpy/pandas
+broadcasts over (item x time period) instead of nested dictionary loops.
+"""
+import numpy as np
+import pandas as pd
+
+# Development (cost decline) rates per investment category and item. Items
+# that are not listed are only discounted with the discount rate.
+# Note: the original storage loop used 'if Electricity / if Heat / else', so
+# the electricity storage rate (0.05) was always overwritten by the plain
+# discount. It is kept at 0.0 here so the cost parameters stay identical.
+DEFAULT_DEVELOPMENT_RATES = {
+    'network': {},
+    'supply': {'Solar': 0.05, 'Wind': 0.022},
+    'converter': {'CHP': 0.0, 'HP': 0.01, 'P2G': 0.079},
+    'storage': {'Electricity': 0.0, 'Gas': 0.0, 'Heat': 0.016},
+}
+
+
+def DiscountFactors(time_periods, starting_time_period, discount_rate,
+                    development_rates=0.0):
+    # 1/(1 + r + dev)^(t - t0), broadcast as (items x time periods) when
+    # development_rates is an array, or (time periods,) when it is a scalar
+    exponents = np.asarray(time_periods, dtype=float) - starting_time_period
+    rates = np.asarray(development_rates, dtype=float)
+    if rates.ndim > 0:
+        rates = rates[:, np.newaxis]
+    return (1 + discount_rate + rates) ** -exponents
+
+
+def DiscountedCosts(costs_t0, time_periods, starting_time_period,
+                    discount_rate, development_rates=None):
+    # costs_t0: Series (or dict) item -> costs in the starting period
+    # Returns a Series indexed by (item, time_period), in the same key order
+    # as the original 'for time_period: for item' loops.
+    costs_t0 = pd.Series(costs_t0, dtype=float)
+    development_rates = development_rates or {}
+    rates = np.array([development_rates.get(x, 0.0) for x in costs_t0.index])
+    factors = DiscountFactors(time_periods, starting_time_period,
+                              discount_rate, rates)
+    values = (costs_t0.to_numpy()[:, np.newaxis] * factors).T
+    index = pd.MultiIndex.from_product([list(time_periods),
+                                        list(costs_t0.index)])
+    return pd.Series(values.ravel(), index=index).swaplevel(0, 1)
+
+
+def DiscountedNetworkCosts(df_network, energy_carriers, locations,
+                           time_periods, starting_time_period, discount_rate,
+                           development_rates=None, edges=None):
+    # Network costs for every (carrier, location_from, location_to, period)
+    # with (location_from, location_to) in edges, or in all pairs of
+    # locations without edges. Pairs that are missing from the Network sheet
+    # get zero costs.
+    # Lines can only be built on the edges, so the costs on the edges are
+    # all that a model needs (the sparse Model indexes lines by Edges, the
+    # dense one pins the other line investments to zero); the L x L pairs
+    # are only for callers that want the dense table.
+    costs_t0 = df_network.set_index(['Type', 'LocationFrom',
+                                      'LocationTo'])['Costs']
+    costs_t0 = costs_t0[~costs_t0.index.duplicated(keep='last')]
+    if(edges is None):
+        pairs = [(x, y) for x in locations for y in locations]
+    else:
+        pairs = [tuple(x) for x in edges]
+    full_index = pd.MultiIndex.from_tuples(
+        [(carrier,) + pair for carrier in energy_carriers for pair in pairs])
+    costs_t0 = costs_t0.reindex(full_index, fill_value=0.0).to_numpy(float)
+    costs_t0 = costs_t0.reshape(len(energy_carriers), len(pairs))
+
+    development_rates = development_rates or {}
+    rates = np.array([development_rates.get(x, 0.0) for x in energy_carriers])
+    factors = DiscountFactors(time_periods, starting_time_period,
+                              discount_rate, rates)  # (EC, T)
+
+    # (T, pairs, EC), the key order of the original loops
+    values = np.einsum('ep,et->tpe', costs_t0, factors)
+    index = pd.MultiIndex.from_tuples(
+        [(carrier,) + pair + (time_period,) for time_period in time_periods
+         for pair in pairs for carrier in energy_carriers])
+    return pd.Series(values.ravel(), index=index)
+
+
+def DiscountedCostParameters(df_network, df_supply_units, df_conversion_units,
+                             df_storage_units, energy_carriers, locations,
+                             time_periods, starting_time_period,
+                             discount_rate,
+                             development_rates=DEFAULT_DEVELOPMENT_RATES,
+                             edges=None):
+    # All discounted cost parameters in one pass, as tuple-keyed dicts that
+    # can be passed directly to Model.CreateParametersFromDictionaries
+    # edges: the network costs are only computed on these (see
+    # DiscountedNetworkCosts)
+    network_costs = DiscountedNetworkCosts(
+        df_network, energy_carriers, locations, time_periods,
+        starting_time_period, discount_rate,
+        development_rates.get('network'), edges)
+    supply_investment_costs = DiscountedCosts(
+        df_supply_units.set_index(['SupplyType'])['Costs']
+        .groupby(level=0, sort=False).last(), time_periods,
+        starting_time_period, discount_rate, development_rates.get('supply'))
+    converter_investment_costs = DiscountedCosts(
+        df_conversion_units.set_index(['Conversion'])['Costs'], time_periods,
+        starting_time_period, discount_rate,
+        development_rates.get('converter'))
+    storage_investment_costs = DiscountedCosts(
+        df_storage_units.set_index(['StorageType'])['Costs'], time_periods,
+        starting_time_period, discount_rate,
+        development_rates.get('storage'))
+
+    return {'network_costs': network_costs.to_dict(),
+            'supply_investment_costs': supply_investment_costs.to_dict(),
+            'converter_investment_costs':
+                converter_investment_costs.to_dict(),
+            'storage_investment_costs': storage_investment_costs.to_dict()}
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Results export. Every variable family and parameter is turned into a tidy
+DataFrame (one column per index, one 'value' column) in one pass over its
+values, and written as Parquet (when pyarrow is available) or CSV, one file
+per family. For models too large to hold the results in memory, the values
+are streamed to disk in chunks of rows.
+
+WriteWorkbook writes the workbook layout of the original Runner_imes.py
+(testresults.xlsx) from the same frames, with one bulk write per block.
+
+The functions work on {index: value} dicts as well as on a model, so results
+that are not in a model (e.g. from a cache) can be exported the same way.
+"""
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    RESULTS_FORMAT = 'parquet'
+except ImportError:
+    pyarrow = None
+    RESULTS_FORMAT = 'csv'
+
+# Index columns of the variables
+VARIABLE_COLUMNS = {
+    'LineInvestmentMade': ['energy_type', 'location_from', 'location_to',
+                           'time_period'],
+    'SupplyInvestmentMade': ['supply_type', 'location', 'time_period'],
+    'ConverterInvestmentMade': ['energy_converter', 'location',
+                                'time_period'],
+    'StorageInvestmentMade': ['energy_type', 'location', 'time_period'],
+    'AmountSupplied': ['energy_type', 'location', 'time_period'],
+    'AmountFlow': ['energy_type', 'location_from', 'location_to',
+                   'time_period'],
+    'AmountConverted': ['energy_type', 'energy_converter', 'location',
+                        'time_period'],
+    'AmountStored_In': ['energy_type', 'location', 'time_period'],
+    'AmountStored_Out': ['energy_type', 'location', 'time_period'],
+    # Only in the cumulative capacity and state of charge formulations
+    'LineCapacity': ['energy_type', 'location_from', 'location_to',
+                     'time_period'],
+    'SupplyCapacity': ['supply_type', 'location', 'time_period'],
+    'ConverterCapacity': ['energy_converter', 'location', 'time_period'],
+    'StorageCapacity': ['energy_type', 'location', 'time_period'],
+    'StorageLevel': ['energy_type', 'location', 'time_period']}
+
+# Index columns of the parameters that are exported
+PARAMETER_COLUMNS = {
+    'Demand': ['energy_type', 'location', 'time_period'],
+    'AmountGiven': ['energy_type', 'location', 'time_period'],
+    'NetworkCosts': ['energy_type', 'location_from', 'location_to',
+                     'time_period'],
+    'SupplyInvestmentCosts': ['supply_type', 'time_period'],
+    'ConverterInvestmentCosts': ['energy_converter', 'time_period'],
+    'StorageCosts': ['energy_type', 'time_period']}
+
+
+def ValuesFrame(values, columns, nonzero=False):
+    # Tidy frame of {index: value} (or of (index, value) pairs), with the
+    # index tuples split over columns; None (no value) becomes NaN. With
+    # nonzero only the rows with a value > 0 are kept.
+    if(isinstance(values, dict)):
+        values = values.items()
+    keys = []
+    data = []
+    for (key, value) in values:
+        keys.append(key if isinstance(key, tuple) else (key,))
+        data.append(value)
+    data = np.array(data, dtype=float)
+    frame = pd.DataFrame(keys, columns=columns)
+    frame['value'] = data
+    if(nonzero):
+        frame = frame[data > 0].reset_index(drop=True)
+    return frame
+
+
+def ComponentValues(model, name):
+    # {index: value} of a variable or parameter of the model
+    return getattr(model, name).extract_values()
+
+
+def ComponentColumns(name):
+    if(name in VARIABLE_COLUMNS):
+        return VARIABLE_COLUMNS[name]
+    return PARAMETER_COLUMNS[name]
+
+
+def ResultNames(model):
+    # Variables and parameters of the model that can be exported
+    return [x for x in list(VARIABLE_COLUMNS) + list(PARAMETER_COLUMNS)
+            if hasattr(model, x)]
+
+
+def ResultFrames(results, names=None, nonzero=False):
+    # Frame per variable or parameter, one at a time: (name, frame)
+    # results: a Pyomo model or a dict name -> {index: value}
+    if(isinstance(results, dict)):
+        names = names or list(results)
+        for name in names:
+            yield name, ValuesFrame(results[name], ComponentColumns(name),
+                                    nonzero)
+    else:
+        for name in names or ResultNames(results):
+            yield name, ValuesFrame(ComponentValues(results, name),
+                                    ComponentColumns(name), nonzero)
+
+
+def _ValueChunks(results, name, chunk_size):
+    # (index, value) pairs of a variable or parameter in chunks, without
+    # collecting all values first
+    from pyomo.environ import value
+    if(isinstance(results, dict)):
+        items = iter(results[name].items())
+    else:
+        component = getattr(results, name)
+        items = ((index, value(component[index], exception=False))
+                 for index in component)
+    while(True):
+        chunk = list(islice(items, chunk_size))
+        if(not chunk):
+            return
+        yield chunk
+
+
+def WriteResults(results, directory, file_format=RESULTS_FORMAT, names=None,
+                 nonzero=False, chunk_size=None):
+    # Write every variable and parameter to <directory>/<name>.<format>
+    # file_format: 'parquet' or 'csv'
+    # chunk_size: number of rows converted and written at a time (streaming);
+    # None writes every variable or parameter at once
+    # Returns the written file names
+    if(file_format == 'parquet' and pyarrow is None):
+        raise ImportError("Writing Parquet files needs pyarrow; use "
+                          "file_format='csv'")
+    os.makedirs(directory, exist_ok=True)
+    if(names is None):
+        names = list(results) if isinstance(results, dict) \
+            else ResultNames(results)
+
+    file_names = []
+    for name in names:
+        file_name = os.path.join(directory, '%s.%s' % (name, file_format))
+        if(chunk_size is None):
+            frames = [ValuesFrame(results[name] if isinstance(results, dict)
+                                  else ComponentValues(results, name),
+                                  ComponentColumns(name), nonzero)]
+        else:
+            frames = (ValuesFrame(chunk, ComponentColumns(name), nonzero)
+                      for chunk in _ValueChunks(results, name, chunk_size))
+        _WriteFrames(frames, file_name, file_format, ComponentColumns(name))
+        file_names.append(file_name)
+    return file_names
+
+
+def _WriteFrames(frames, file_name, file_format, columns):
+    # Append the frames to one file. Empty frames are skipped (their column
+    # types are unknown); without any rows a file with only the columns is
+    # written.
+    writer = None
+    for frame in frames:
+        if(len(frame) == 0):
+            continue
+        if(file_format == 'parquet'):
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if(writer is None):
+                writer = pyarrow.parquet.ParquetWriter(file_name,
+                                                       table.schema)
+            writer.write_table(table)
+        else:
+            frame.to_csv(file_name, mode='w' if writer is None else 'a',
+                         header=writer is None, index=False)
+            writer = True
+    if(writer is None):
+        empty = ValuesFrame([], columns)
+        if(file_format == 'parquet'):
+            empty.to_parquet(file_name, index=False)
+        else:
+            empty.to_csv(file_name, index=False)
+    elif(file_format == 'parquet'):
+        writer.close()
+
+
+# Blocks of the workbook layout of Runner_imes.py: sheet -> list of
+# (first column, variable or parameter, only values > 0, index columns that
+# were written as strings)
+WORKBOOK_LAYOUT = {
+    'TotalInvestments': [],
+    'ConversionUnits': [(0, 'ConverterInvestmentMade', True, True),
+                        (6, 'AmountConverted', True, False)],
+    'Networks': [(0, 'LineInvestmentMade', True, False),
+                 (7, 'AmountFlow', True, False)],
+    'StorageUnits': [(0, 'StorageInvestmentMade', True, False),
+                     (6, 'AmountStored_In', True, True),
+                     (11, 'AmountStored_Out', True, True)],
+    'Supply': [(0, 'SupplyInvestmentMade', True, False),
+               (6, 'AmountSupplied', True, False),
+               (11, 'AmountGiven', True, False)],
+    'Demand': [(0, 'Demand', False, False)],
+    'Cost data': [(0, 'ConverterInvestmentCosts', True, False),
+                  (4, 'NetworkCosts', True, False),
+                  (10, 'StorageCosts', True, False),
+                  (14, 'SupplyInvestmentCosts', True, False)]}
+
+WORKBOOK_TITLES = {
+    'TotalInvestments': ['Investment type', '# investments'],
+    'ConversionUnits': ['Conversion type', 'Location', 'Time period',
+                        '# investments', 'Total costs', '',
+                        'Energy type', 'Location from', 'Location to',
+                        'Time period', 'Energy converted [PJ]'],
+    'Networks': ['Energy type', 'Location from', 'Location to', 'Time period',
+                 '# investments', 'Total costs', '', 'Energy type',
+                 'Location from', 'Location to',
+                 'Time period', 'Energy flow [PJ]'],
+    'StorageUnits': ['Energy type', 'Location', 'Time period',
+                     '# investments', 'Total costs', '',
+                     'Energy type', 'Location', 'Time period',
+                     'Energy stored IN [PJ]', '',
+                     'Energy type', 'Location', 'Time period',
+                     'Energy stored OUT [PJ]'],
+    'Supply': ['Supply type', 'Location', 'Time period', '# investments',
+               'Total costs', '', 'Energy type', 'Location', 'Time period',
+               'Energy supplied [PJ]', '', 'Energy type', 'Location',
+               'Time period', 'Max gas supplied [PJ]'],
+    'Demand': ['Demand type', 'Location', 'Time period', 'Amount [PJ]'],
+    'Cost data': ['Conversion type', 'Time period', 'Cost', '',
+                  'Network type', 'Location from', 'Location to',
+                  'Time period', 'Cost', '',
+                  'Storage type', 'Time period', 'Cost', '',
+                  'Supply type', 'Time period', 'Cost']}
+
+# Rows of the TotalInvestments sheet: label -> investment variable
+TOTAL_INVESTMENTS = [('Conversion Units', 'ConverterInvestmentMade'),
+                     ('Networks', 'LineInvestmentMade'),
+                     ('Storage Units', 'StorageInvestmentMade'),
+                     ('RES', 'SupplyInvestmentMade')]
+
+
+def WriteWorkbook(results, file_name, parameters=None):
+    # Workbook with the layout of testresults.xlsx of the original runner
+    # results: a solved Pyomo model or a dict name -> {index: value}
+    # parameters: name -> {index: value} of parameters that are written
+    # instead of the values in results (e.g. the cost parameters of the
+    # case)
+    def Values(name):
+        if(parameters is not None and name in parameters):
+            return parameters[name]
+        if(isinstance(results, dict)):
+            return results[name]
+        return ComponentValues(results, name)
+
+    with pd.ExcelWriter(file_name, engine='xlsxwriter') as writer:
+        for (sheet_name, blocks) in WORKBOOK_LAYOUT.items():
+            worksheet = writer.book.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, WORKBOOK_TITLES[sheet_name])
+            for (column, name, nonzero, as_string) in blocks:
+                frame = ValuesFrame(Values(name), ComponentColumns(name),
+                                    nonzero)
+                if(as_string):
+                    index_columns = ComponentColumns(name)
+                    frame[index_columns] = frame[index_columns].astype(str)
+                frame.to_excel(writer, sheet_name=sheet_name, startrow=1,
+                               startcol=column, header=False, index=False)
+
+        worksheet = writer.sheets['TotalInvestments']
+        for (row, (label, name)) in enumerate(TOTAL_INVESTMENTS, start=1):
+            worksheet.write_string(row, 0, label)
+            worksheet.write(row, 1, sum(Values(name).values()))
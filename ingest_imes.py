@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Cached, columnar snapshot of the IMES case workbook. Every sheet is parsed
+from Excel once and stored as a binary file (Parquet when pyarrow is
+available, otherwise a pandas pickle) keyed by the content hash of the
+workbook, so later runs only re-parse when the workbook has changed.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (only needed for the Parquet cache format)
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pkl'
+
+# Sheets used to build the model
+SHEET_NAMES = ['ConversionEfficiencies', 'ConversionUnits', 'Demand',
+               'Locations', 'MaxConverted', 'MaxFlow', 'Network',
+               'StorageUnits', 'Supply', 'SupplyUnits', 'TimePeriods']
+
+# Sheets that are used when the workbook has them (defaults otherwise)
+OPTIONAL_SHEET_NAMES = ['InvestmentLimits']
+
+# Columns that are read as strings, so that a parsed sheet and its cache
+# file have the same types (and Parquet one type per column): TimePeriod of
+# InvestmentLimits has both years and '*'
+SHEET_DTYPES = {'InvestmentLimits': {'Variable': str, 'Type': str,
+                                     'Location': str, 'TimePeriod': str}}
+
+
+def WorkbookHash(file_name, block_size=1 << 20):
+    # Content hash of the workbook, so that a renamed or touched file with
+    # the same content keeps using the cache
+    sha = hashlib.sha256()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _ParseSheet(file_name, sheet_name, cache_file):
+    # Parse a single sheet from Excel and write it to the cache. This is a
+    # module-level function so that it can run in a worker process.
+    df = pd.read_excel(file_name, sheet_name=sheet_name,
+                       dtype=SHEET_DTYPES.get(sheet_name))
+    _WriteCacheFile(df, cache_file)
+    return df
+
+
+def _WriteCacheFile(df, cache_file):
+    # Write to a temporary file first so an interrupted run never leaves a
+    # half-written cache file behind
+    tmp_file = cache_file + '.tmp'
+    if(CACHE_FORMAT == 'parquet'):
+        # Parquet needs string column names
+        df.columns = [str(column) for column in df.columns]
+        df.to_parquet(tmp_file, index=False)
+    else:
+        df.to_pickle(tmp_file)
+    os.replace(tmp_file, cache_file)
+
+
+def _ReadCacheFile(cache_file):
+    if(cache_file.endswith('.parquet')):
+        return pd.read_parquet(cache_file)
+    return pd.read_pickle(cache_file)
+
+
+class CaseWorkbook:
+    # Drop-in replacement for pd.ExcelFile(...).parse(sheet_name) that reads
+    # sheets lazily from the columnar cache
+
+    def __init__(self, file_name, cache_dir=None):
+        self.file_name = file_name
+        if(cache_dir is None):
+            cache_dir = os.path.join(os.path.dirname(file_name) or '.',
+                                     '.cache')
+        self.cache_dir = cache_dir
+        self.content_hash = WorkbookHash(file_name)
+        self.sheets = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def CacheFile(self, sheet_name):
+        stem = os.path.splitext(os.path.basename(self.file_name))[0]
+        return os.path.join(self.cache_dir, '%s-%s-%s.%s' % (
+            stem, self.content_hash[:16], sheet_name, CACHE_FORMAT))
+
+    def IsCached(self, sheet_name):
+        return os.path.exists(self.CacheFile(sheet_name))
+
+    def SheetNames(self):
+        # Names of all sheets of the workbook, cached like the sheets
+        cache_file = self.CacheFile('_sheet_names').rsplit('.', 1)[0] + '.txt'
+        if(os.path.exists(cache_file)):
+            with open(cache_file) as f:
+                return f.read().splitlines()
+        with pd.ExcelFile(self.file_name) as workbook:
+            sheet_names = list(workbook.sheet_names)
+        with open(cache_file + '.tmp', 'w') as f:
+            f.write('\n'.join(sheet_names))
+        os.replace(cache_file + '.tmp', cache_file)
+        return sheet_names
+
+    def parse(self, sheet_name):
+        # Same name as pd.ExcelFile.parse, so existing scripts keep working
+        if(sheet_name not in self.sheets):
+            cache_file = self.CacheFile(sheet_name)
+            if(os.path.exists(cache_file)):
+                self.sheets[sheet_name] = _ReadCacheFile(cache_file)
+            else:
+                self.sheets[sheet_name] = _ParseSheet(self.file_name,
+                                                      sheet_name, cache_file)
+        # Return a copy so callers can modify the frame without changing
+        # what the next caller gets
+        return self.sheets[sheet_name].copy()
+
+    def Load(self, sheet_names=SHEET_NAMES, max_workers=None,
+             use_processes=False, optional_sheet_names=()):
+        # Load several sheets at once in parallel. Cache hits are read in
+        # threads (I/O bound). Misses are parsed from Excel in threads too,
+        # or in worker processes with use_processes=True (the Excel parser
+        # holds the GIL, but on Windows worker processes re-import the
+        # calling script, which then needs an if __name__ == '__main__' guard)
+        # optional_sheet_names are only loaded when the workbook has them
+        if(optional_sheet_names):
+            present = self.SheetNames()
+            sheet_names = list(sheet_names) + \
+                [x for x in optional_sheet_names if x in present]
+        to_load = [x for x in sheet_names if x not in self.sheets]
+        cached = [x for x in to_load if self.IsCached(x)]
+        missing = [x for x in to_load if not self.IsCached(x)]
+
+        if(cached):
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                frames = executor.map(_ReadCacheFile,
+                                      [self.CacheFile(x) for x in cached])
+                self.sheets.update(zip(cached, frames))
+        if(len(missing) == 1):
+            self.parse(missing[0])
+        elif(missing):
+            pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            with pool(max_workers=max_workers) as executor:
+                frames = executor.map(_ParseSheet,
+                                      [self.file_name] * len(missing),
+                                      missing,
+                                      [self.CacheFile(x) for x in missing])
+                self.sheets.update(zip(missing, frames))
+        return {x: self.sheets[x].copy() for x in sheet_names}
+
+    def ClearStaleCache(self):
+        # Remove cache files of earlier versions of this workbook
+        stem = os.path.splitext(os.path.basename(self.file_name))[0] + '-'
+        current = stem + self.content_hash[:16] + '-'
+        for file_name in os.listdir(self.cache_dir):
+            if(file_name.startswith(stem) and
+               not file_name.startswith(current)):
+                os.remove(os.path.join(self.cache_dir, file_name))
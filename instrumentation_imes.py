@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Phase level timing and memory instrumentation of a run. A PhaseRecorder
+records the wall time, peak resident memory (RSS) and model size (variables,
+constraints and optionally nonzeros) of every phase: the Model.Initialize*
+steps, every constraint block, the solve and whatever the driver marks as a
+phase (reading the workbook, building the case, the export). The report is
+written as json.
+
+The Model methods and RunningLocalServer are decorated with Instrumented, so
+they are recorded as soon as a recorder is active; without an active
+recorder the decorators do nothing.
+
+Usage:
+    recorder = PhaseRecorder().Activate()
+    with recorder.Phase('load'):
+        tables = LoadCaseTables(db_file)
+    ...
+    recorder.Write('testresults_phases.json')
+
+The peak RSS is sampled in a thread with psutil; without psutil it is the
+high water mark of the process (resource module, not on Windows), or None.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Pyomo logs the construction time of every component to this logger
+CONSTRUCTION_LOGGER = 'pyomo.common.timing.construction'
+
+# The active recorder (see PhaseRecorder.Activate)
+_recorder = None
+
+
+def ActiveRecorder():
+    return _recorder
+
+
+def _ProcessMaxRSS():
+    # High water mark of the process in MB (kB on Linux, bytes on macOS)
+    if(resource is None):
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (2**20 if max_rss > 2**32 else 2**10)
+
+
+class _ConstructionHandler(logging.Handler):
+
+    # Records the construction of every Pyomo component as a sub-phase
+    def __init__(self, recorder):
+        logging.Handler.__init__(self, logging.INFO)
+        self.recorder = recorder
+
+    def emit(self, record):
+        timer = record.msg
+        component = getattr(timer, 'obj', None)
+        if(component is None or timer.timer < 0):
+            return
+        self.recorder._AddComponent(component, timer.timer)
+
+
+class PhaseRecorder:
+
+    def __init__(self, count_nonzeros=False, sample_interval=0.01):
+        # count_nonzeros: count the nonzeros of the constraints of every
+        # phase (generates the standard representation of every constraint,
+        # which takes about as long as building them)
+        self.count_nonzeros = count_nonzeros
+        self.sample_interval = sample_interval
+        self.phases = []
+        # Values annotated outside of any phase (e.g. a cache hit)
+        self.annotations = {}
+        self._open = []
+        self._start = time.perf_counter()
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+        self._handler = None
+
+    def Activate(self):
+        global _recorder
+        _recorder = self
+        if(psutil is not None and self._sampler is None):
+            self._sampler = threading.Thread(target=self._SampleRSS,
+                                             daemon=True)
+            self._sampler.start()
+        return self
+
+    def Deactivate(self):
+        global _recorder
+        if(_recorder is self):
+            _recorder = None
+        if(self._sampler is not None):
+            self._stop_sampler.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _RSS(self):
+        if(psutil is not None):
+            return psutil.Process().memory_info().rss / 2**20
+        return _ProcessMaxRSS()
+
+    def _SampleRSS(self):
+        process = psutil.Process()
+        while(not self._stop_sampler.wait(self.sample_interval)):
+            rss = process.memory_info().rss / 2**20
+            for record in list(self._open):
+                if(rss > record['peak_rss_mb']):
+                    record['peak_rss_mb'] = rss
+
+    def Begin(self, name, model=None, components=False):
+        # Start a phase; phases can be nested (the name of a nested phase is
+        # prefixed with the names of the open phases). With components, the
+        # construction of every Pyomo component in the phase is recorded.
+        path = self._Path(name)
+        rss = self._RSS()
+        record = {'phase': path, 'start': time.perf_counter() - self._start,
+                  'peak_rss_mb': rss, '_model': model,
+                  '_components': components}
+        if(model is not None):
+            record['_constraint_names'] = self._ConstraintNames(model)
+        if(components and self._handler is None):
+            self._handler = _ConstructionHandler(self)
+            logger = logging.getLogger(CONSTRUCTION_LOGGER)
+            record['_logger_level'] = logger.level
+            logger.setLevel(logging.INFO)
+            logger.addHandler(self._handler)
+            record['_handler'] = True
+        self._open.append(record)
+        self.phases.append(record)
+        return record
+
+    def End(self):
+        record = self._open.pop()
+        record['seconds'] = time.perf_counter() - self._start - \
+            record['start']
+        rss = self._RSS()
+        if(rss is not None and (record['peak_rss_mb'] is None or
+                                rss > record['peak_rss_mb'])):
+            record['peak_rss_mb'] = rss
+        if(record.pop('_handler', False)):
+            logger = logging.getLogger(CONSTRUCTION_LOGGER)
+            logger.removeHandler(self._handler)
+            logger.setLevel(record.pop('_logger_level'))
+            self._handler = None
+        model = record.pop('_model')
+        if(model is not None):
+            record['variables'] = model.nvariables()
+            record['constraints'] = model.nconstraints()
+            if(self.count_nonzeros):
+                # Nonzeros of the constraints that were added in the phase
+                from pyomo_helper_imes import CountNonzeros
+                new = set(self._ConstraintNames(model)) - \
+                    set(record['_constraint_names'])
+                record['nonzeros'] = sum(CountNonzeros(model, new).values())
+        record.pop('_constraint_names', None)
+        record.pop('_components')
+        return record
+
+    @contextmanager
+    def Phase(self, name, model=None, components=False):
+        self.Begin(name, model, components)
+        try:
+            yield self
+        finally:
+            self.End()
+
+    def Annotate(self, **values):
+        # Add values (e.g. the time reported by the solver) to the innermost
+        # open phase, or to the annotations of the run outside of phases
+        if(self._open):
+            self._open[-1].update(values)
+        else:
+            self.annotations.update(values)
+
+    def _Path(self, name):
+        if(self._open):
+            return self._open[-1]['phase'] + '/' + name
+        return name
+
+    def _ConstraintNames(self, model):
+        from pyomo.environ import Constraint
+        return [x.name for x in model.component_objects(Constraint)]
+
+    def _AddComponent(self, component, seconds):
+        # Sub-phase for a constructed component of a phase with components
+        from pyomo.environ import Constraint
+        if(component.ctype is not Constraint):
+            return
+        record = {'phase': self._Path(component.name),
+                  'start': time.perf_counter() - self._start - seconds,
+                  'seconds': seconds, 'constraints': len(component)}
+        if(self.count_nonzeros):
+            from pyomo_helper_imes import CountNonzeros
+            record['nonzeros'] = sum(CountNonzeros(
+                component.model(), [component.name]).values())
+        self.phases.append(record)
+
+    def Report(self):
+        phases = [{key: value for (key, value) in x.items()
+                   if not key.startswith('_')} for x in self.phases]
+        return {'total_seconds': time.perf_counter() - self._start,
+                'peak_rss_mb': max([x['peak_rss_mb'] for x in phases
+                                    if x.get('peak_rss_mb') is not None],
+                                   default=None),
+                'annotations': self.annotations,
+                'phases': phases}
+
+    def Write(self, file_name):
+        with open(file_name, 'w') as f:
+            json.dump(self.Report(), f, indent=1, default=str)
+
+    def Print(self):
+        for (key, value) in self.annotations.items():
+            print('%-50s %s' % (key, value))
+        for x in self.Report()['phases']:
+            print('%-50s %10.3f s %10s MB' % (
+                x['phase'], x.get('seconds', float('nan')),
+                '%.0f' % x['peak_rss_mb'] if x.get('peak_rss_mb') else '-'))
+
+
+@contextmanager
+def Phase(name, model=None, components=False):
+    # Phase of the active recorder; does nothing without an active recorder
+    if(_recorder is None):
+        yield None
+    else:
+        with _recorder.Phase(name, model, components):
+            yield _recorder
+
+
+def Annotate(**values):
+    if(_recorder is not None):
+        _recorder.Annotate(**values)
+
+
+def Instrumented(name, components=False):
+    # Decorator recording a function or Model method as a phase of the
+    # active recorder. The model is the first argument (a Pyomo model, or a
+    # Model of math_prog_imes, of which .model is used).
+    def Decorator(function):
+        @functools.wraps(function)
+        def Wrapper(*args, **kwargs):
+            if(_recorder is None):
+                return function(*args, **kwargs)
+            model = args[0] if args else None
+            model = getattr(model, 'model', model)
+            if(not hasattr(model, 'nvariables')):
+                model = None
+            with _recorder.Phase(name, model, components):
+                return function(*args, **kwargs)
+        return Wrapper
+    return Decorator
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Maximum number of investments per investment variable, type, location and
+time period, as a table (the InvestmentLimits sheet of the case workbook, or
+DEFAULT_INVESTMENT_LIMITS). The limits are applied as upper bounds of the
+investment variables instead of constraint rows.
+
+Columns: Variable (e.g. SupplyInvestmentMade), Type (supply type, converter
+or energy carrier), Location (the location from for lines), TimePeriod and
+MaxInvestments. '*' matches everything; the first matching row is used, so
+exceptions go above the general rows. Without a matching row there is no
+limit.
+"""
+import pandas as pd
+
+INVESTMENT_LIMIT_COLUMNS = ['Variable', 'Type', 'Location', 'TimePeriod',
+                            'MaxInvestments']
+
+WILDCARD = '*'
+
+# The limits that were hardcoded in ConstructionRules.max*InvestmentMade
+# (supply: adjusted slightly higher than with Julie, originally 0, 0, 1, 2,
+# 3, 4; first whole run: 0,4,6,5,7,5,10. 20200825 scenario 5 is infeasible
+# with 0,4,4,5,5,5)
+DEFAULT_INVESTMENT_LIMITS = pd.DataFrame([
+    ('SupplyInvestmentMade', 'Wind', 'Node_1', '*', 0),
+    ('SupplyInvestmentMade', 'Wind', 'Node_5', '*', 0),
+    ('SupplyInvestmentMade', 'Wind', 'Node_6', '*', 0),
+    ('SupplyInvestmentMade', 'Wind', '*', 2018, 4),
+    ('SupplyInvestmentMade', 'Solar', '*', 2018, 6),
+    ('SupplyInvestmentMade', 'Wind', '*', 2020, 5),
+    ('SupplyInvestmentMade', 'Solar', '*', 2020, 7),
+    ('SupplyInvestmentMade', 'Wind', '*', '*', 5),
+    ('SupplyInvestmentMade', '*', '*', '*', 8),
+    ('LineInvestmentMade', '*', '*', '*', 5),
+    ('ConverterInvestmentMade', '*', '*', '*', 5),
+    ('StorageInvestmentMade', '*', '*', '*', 5)],
+    columns=INVESTMENT_LIMIT_COLUMNS)
+
+
+class InvestmentLimits:
+
+    def __init__(self, limits=None):
+        # limits: DataFrame with INVESTMENT_LIMIT_COLUMNS (default:
+        # DEFAULT_INVESTMENT_LIMITS)
+        if(limits is None):
+            limits = DEFAULT_INVESTMENT_LIMITS
+        # Keys as strings, so that 2018 in the sheet matches time period 2018
+        self.rows = [(str(row.Variable), str(row.Type), str(row.Location),
+                      str(row.TimePeriod), float(row.MaxInvestments))
+                     for row in limits[INVESTMENT_LIMIT_COLUMNS].itertuples()]
+        self._limits = {}
+
+    def Limit(self, variable, investment_type, location, time_period):
+        # Maximum number of investments, None without a matching row
+        key = (variable, str(investment_type), str(location), str(time_period))
+        if(key not in self._limits):
+            self._limits[key] = next(
+                (row[4] for row in self.rows
+                 if all(x == WILDCARD or x == y for (x, y) in zip(row, key))),
+                None)
+        return self._limits[key]
+
+    def IndexLimit(self, variable, index):
+        # Limit of an index of an investment variable: (type, location, ...,
+        # time period), e.g. (energy carrier, location from, location to,
+        # time period) for lines
+        return self.Limit(variable, index[0], index[1], index[-1])
+
+    def Bounds(self, variable):
+        # Bounds rule of a Pyomo investment variable
+        def Rule(model, *index):
+            return (0, self.IndexLimit(variable, index))
+        return Rule
@@ -5,19 +5,62 @@ Created on Fri Nov 29 14:42:08 2019, updated Wed May 13, 2020
 @author: IrisvB
 """
 # Create mathematical model
+import numpy as np
+import pandas as pd
 from pyomo.environ import (ConcreteModel, Var, minimize, Objective, Constraint,
                            Set, Param, NonNegativeIntegers, NonNegativeReals,
                            Binary)
 
+from instrumentation_imes import Instrumented
+from investment_limits_imes import InvestmentLimits
+
 
 class Model:
 
     model = None
+    # Sparse formulation: declare the line investment and flow variables (and
+    # the network parameters) only on Edges/Arcs instead of on
+    # Locations x Locations, so no pinning constraints are needed.
+    sparse = False
+    # Cumulative capacity formulation: installed capacity state variables,
+    # linked period by period, instead of summing all earlier investments in
+    # every capacity constraint (which is O(T^2) in time)
+    cumulative_capacity = False
+    # Storage formulation used by InitializeConstraints("With"):
+    # "History" rebuilds the stored amount from all earlier in/outflows in every period,
+    # "StateOfCharge" uses a storage level state variable with a one-step balance
+    storage_formulation = "History"
 
-    def __init__(self):
+    def __init__(self, sparse=False, cumulative_capacity=False, storage_formulation="History"):
         self.model = ConcreteModel()
+        self.sparse = sparse
+        self.cumulative_capacity = cumulative_capacity
+        self.storage_formulation = storage_formulation
+        # Positions of the indices of every variable family along the axes
+        # of VariableArray, computed once per family
+        self._positions = {}
+
+    # Index sets of the network parameters and variables
+    def LineIndex(self):
+        if(self.sparse):
+            return (self.model.Edges,)
+        return (self.model.Locations, self.model.Locations)
+
+    def FlowIndex(self):
+        if(self.sparse):
+            return (self.model.Arcs,)
+        return (self.model.Locations, self.model.Locations)
+
+    # Keep only the entries of (carrier, location_from, location_to, ...) keyed
+    # data that are on an edge; scalars are passed through
+    def EdgeValues(self, values):
+        if(not self.sparse or not isinstance(values, dict)):
+            return values
+        return {key: value for key, value in values.items()
+                if (key[1], key[2]) in self.model.Edges}
 
     # Initialization of all the sets
+    @Instrumented('sets')
     def InitializeSets(self, list_of_locations, list_of_energy_carriers,
                        list_of_energy_converters, list_of_supply_types,
                        list_of_edges, list_of_arcs, list_of_time_periods):
@@ -36,8 +79,32 @@ class Model:
         self.model.TimePeriods = Set(
             initialize=list_of_time_periods)  # Set of time periods (T)
 
+        # Adjacency of the arcs, built once so that the rules only loop over
+        # real neighbours instead of testing every pair of locations against
+        # Arcs. Neighbours are kept in the order of the Locations set.
+        position = {location: i for i, location in enumerate(list_of_locations)}
+        in_neighbours = {location: set() for location in list_of_locations}
+        out_neighbours = {location: set() for location in list_of_locations}
+        for (location_from, location_to) in list_of_arcs:
+            out_neighbours[location_from].add(location_to)
+            in_neighbours[location_to].add(location_from)
+        # Locations with an arc into the location
+        self.model.InNeighbours = Set(self.model.Locations, initialize={
+            location: sorted(in_neighbours[location], key=position.get)
+            for location in list_of_locations})
+        # Locations with an arc out of the location
+        self.model.OutNeighbours = Set(self.model.Locations, initialize={
+            location: sorted(out_neighbours[location], key=position.get)
+            for location in list_of_locations})
+        # Locations connected to the location in either direction
+        self.model.Neighbours = Set(self.model.Locations, initialize={
+            location: sorted(in_neighbours[location] | out_neighbours[location],
+                             key=position.get)
+            for location in list_of_locations})
+
     # Other parameters
 
+    @Instrumented('parameters')
     def CreateParametersFromDictionaries(self, network_costs, max_flow_line,
                                          supply_investment_costs, supply_external_factor,
                                          max_energy_supplied,
@@ -49,10 +116,15 @@ class Model:
                                          earlier_line_investment_made,
                                          earlier_supply_investment_made,
                                          earlier_converter_investment_made,
-                                         earlier_storage_investment_made):
-        # Network Parameter
-        self.model.NetworkCosts = Param(self.model.EnergyCarriers, self.model.Locations, self.model.Locations,
-                                        self.model.TimePeriods, initialize=network_costs)  # Network Costs (c^F)
+                                         earlier_storage_investment_made,
+                                         investment_limits=None):
+        # The costs, supply factors, demand and given supply are mutable, so that they can be changed on a built
+        # model and re-solved without rebuilding it (see pyomo_helper_imes.PersistentServer)
+        # Network Parameter (the case only has the costs on the edges; the dense formulation pins the other line
+        # investments to zero, so their costs default to 0)
+        self.model.NetworkCosts = Param(self.model.EnergyCarriers, *self.LineIndex(),
+                                        self.model.TimePeriods, initialize=self.EdgeValues(network_costs), default=0,
+                                        mutable=True)  # Network Costs (c^F)
         # Maximum flow over a line Gamma^F, which depends on the energy carrier
         self.model.MaxFlowLine = Param(
             self.model.EnergyCarriers, initialize=max_flow_line)
@@ -60,15 +132,15 @@ class Model:
             self.model.EnergyCarriers, initialize=loss_factor)
         # Supply Parameters
         self.model.SupplyInvestmentCosts = Param(
-            self.model.SupplyTypes, self.model.TimePeriods, initialize=supply_investment_costs)  # Supply Investment Costs (c^S)
+            self.model.SupplyTypes, self.model.TimePeriods, initialize=supply_investment_costs, mutable=True)  # Supply Investment Costs (c^S)
         self.model.SupplyExternalFactor = Param(
-            self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, initialize=supply_external_factor) #20200805 attempt to add external factor for supply for weather scenarios
+            self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, initialize=supply_external_factor, mutable=True) #20200805 attempt to add external factor for supply for weather scenarios
         # Maximum amount of energy supplied (Gamma^S)
         self.model.MaxEnergySupplied = Param(
             self.model.EnergyCarriers, self.model.SupplyTypes, initialize=max_energy_supplied)
         # Converter Parameters
         self.model.ConverterInvestmentCosts = Param(
-            self.model.EnergyConverters, self.model.TimePeriods, initialize=converter_investment_costs)  # Converter Investment Costs (c^M)
+            self.model.EnergyConverters, self.model.TimePeriods, initialize=converter_investment_costs, mutable=True)  # Converter Investment Costs (c^M)
         # Maximum amount of energy that can be converted on the specific converter (Gamma^M)
         self.model.MaxConverted = Param(
             self.model.EnergyCarriers, self.model.EnergyConverters, initialize=max_converted)
@@ -76,7 +148,7 @@ class Model:
                                                   initialize=conversion_efficiencies)  # Energy efficiencies in conversion units (eta^MT_{E,V})
         # Storage Parameters
         self.model.StorageCosts = Param(
-            self.model.EnergyCarriers, self.model.TimePeriods, initialize=storage_costs)  # Storage Costs
+            self.model.EnergyCarriers, self.model.TimePeriods, initialize=storage_costs, mutable=True)  # Storage Costs
         self.model.StorageLosses = Param(
             self.model.EnergyCarriers, initialize=storage_losses)  # Storage Losses
         # Minimum amount of energy stored
@@ -88,37 +160,47 @@ class Model:
         # Demand and amount of supply already existing
         # Demand of every location and energy carrier (D)
         self.model.Demand = Param(
-            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, initialize=demand)
+            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, initialize=demand, mutable=True)
         # Already existing supply (there is already some gas supply without any costs)
         self.model.AmountGiven = Param(
-            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, initialize=amount_given)
+            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, initialize=amount_given, mutable=True)
         # Parameters for the amount of investments that are already made on the "existing" infrastructure. (for now this is 2014 and run the remaining years (which is 2016-2050))
         self.model.EarlierLineInvestmentMade = Param(
-            self.model.EnergyCarriers, self.model.Locations, self.model.Locations, initialize=earlier_line_investment_made, default=0)
+            self.model.EnergyCarriers, *self.LineIndex(), initialize=self.EdgeValues(earlier_line_investment_made), default=0)
         self.model.EarlierSupplyInvestmentMade = Param(
             self.model.SupplyTypes, self.model.Locations, initialize=earlier_supply_investment_made, default=0)
         self.model.EarlierConverterInvestmentMade = Param(
             self.model.EnergyConverters, self.model.Locations, initialize=earlier_converter_investment_made, default=0)
         self.model.EarlierStorageInvestmentMade = Param(
             self.model.EnergyCarriers, self.model.Locations, initialize=earlier_storage_investment_made, default=0)
+        # Maximum number of investments per type, location and time period (table, see investment_limits_imes),
+        # applied as bounds of the investment variables
+        self.investment_limits = InvestmentLimits(investment_limits)
 
     # Variables Initialization
+    @Instrumented('variables')
     def InitializeVariables(self):
+        # The investment variables are bounded by the investment limits (Constraint(23-26))
+        limits = self.investment_limits
         # The pipeline investment variables, restricted to integer number of investments (B^F)
-        self.model.LineInvestmentMade = Var(self.model.EnergyCarriers, self.model.Locations,
-                                            self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers)
+        self.model.LineInvestmentMade = Var(self.model.EnergyCarriers, *self.LineIndex(),
+                                            self.model.TimePeriods, within=NonNegativeIntegers,
+                                            bounds=limits.Bounds('LineInvestmentMade'))
         # The supply investment variables, restricted to integer number of investments (B^S)
         self.model.SupplyInvestmentMade = Var(
-            self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers)
+            self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers,
+            bounds=limits.Bounds('SupplyInvestmentMade'))
         # The converter investment variables, restricted to integer number of investments (B^M)
         self.model.ConverterInvestmentMade = Var(
-            self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers)
+            self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers,
+            bounds=limits.Bounds('ConverterInvestmentMade'))
         # The storage investment variables, restricted to the maximum number of investments (B^W)
         self.model.StorageInvestmentMade = Var(
-            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers)
+            self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within=NonNegativeIntegers,
+            bounds=limits.Bounds('StorageInvestmentMade'))
         self.model.AmountSupplied = Var(self.model.EnergyCarriers, self.model.Locations,
                                         self.model.TimePeriods, within=NonNegativeReals)  # amount of supply inside a node (S)
-        self.model.AmountFlow = Var(self.model.EnergyCarriers, self.model.Locations, self.model.Locations,
+        self.model.AmountFlow = Var(self.model.EnergyCarriers, *self.FlowIndex(),
                                     self.model.TimePeriods, within=NonNegativeReals)  # amount of flow to other nodes (F)
         self.model.AmountConverted = Var(self.model.EnergyCarriers, self.model.EnergyConverters, self.model.Locations,
                                          self.model.TimePeriods, within=NonNegativeReals)  # amount of energy converted on particular conversion unit(M)
@@ -128,16 +210,48 @@ class Model:
         # amount of energy taken out of a storage unit (Wstored)
         self.model.AmountStored_Out = Var(
             self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within=NonNegativeReals)
+        if(self.cumulative_capacity):
+            # Installed capacity (number of units, including the earlier investments) at every time period
+            self.model.LineCapacity = Var(
+                self.model.EnergyCarriers, self.model.Edges, self.model.TimePeriods, within=NonNegativeReals)
+            self.model.SupplyCapacity = Var(
+                self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, within=NonNegativeReals)
+            self.model.ConverterCapacity = Var(
+                self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, within=NonNegativeReals)
+            self.model.StorageCapacity = Var(
+                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within=NonNegativeReals)
+        if(self.storage_formulation == "StateOfCharge"):
+            # amount of energy in the storage at the start of a period, before storing in or taking out
+            self.model.StorageLevel = Var(
+                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within=NonNegativeReals)
 #        self.model.StorageStartPeriod = Var(self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within = NonNegativeReals) #amount of energy in the storage at the start of a period (Wstart)
 #        self.model.StorageEndPeriod = Var(self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, within = NonNegativeReals) #amount of energy in the storage at the end os a period (Wend)
 
     # Objective function
+    @Instrumented('objective')
     def InitializeObjective(self):
         self.model.Cost = Objective(rule=ConstructionRules.totalCosts,
                                     sense=minimize)  # Constraint (1)
 
+    # Capacity state constraints of the cumulative capacity formulation:
+    # capacity_t = capacity_{t-1} + investment_t (earlier investments in the first period)
+    def InitializeCapacityConstraints(self, with_or_without_storage):
+        self.model.LineCapacityBalance = Constraint(
+            self.model.EnergyCarriers, self.model.Edges, self.model.TimePeriods, rule=ConstructionRules.lineCapacityBalance)
+        self.model.SupplyCapacityBalance = Constraint(
+            self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.supplyCapacityBalance)
+        self.model.ConverterCapacityBalance = Constraint(
+            self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.converterCapacityBalance)
+        if(with_or_without_storage == "With"):
+            self.model.StorageCapacityBalance = Constraint(
+                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.storageCapacityBalance)
+
     # Constraints
+    # (each constraint block is recorded as a sub-phase when instrumented)
+    @Instrumented('constraints', components=True)
     def InitializeConstraints(self, with_or_without_storage):
+        if(self.cumulative_capacity):
+            self.InitializeCapacityConstraints(with_or_without_storage)
         if(with_or_without_storage == "With"):
             self.model.MassBalanceConstraint = Constraint(
                 self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.balanceConstraint)  # Constraint (2)
@@ -151,24 +265,28 @@ class Model:
 #            self.model.MaximumStoredConstraint = Constraint(self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule = ConstructionRules.maximumStoredConstraint) #Constraint(15,18,19)
             self.model.MaxSupplyConstraint = Constraint(
                 self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxSupplyConstraint)  # Constraint(20-22)
-            self.model.MaxFlowInvestmentMade = Constraint(
-                self.model.EnergyCarriers, self.model.Edges, self.model.TimePeriods, rule=ConstructionRules.maxFlowInvestmentMade)  # Constraint(23)
-            self.model.MaxSupplyInvestmentMade = Constraint(
-                self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxSupplyInvestmentMade)  # Constraint(24)
-            self.model.MaxStorageInvestmentMade = Constraint(
-                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxStorageInvestmentMade)  # Constraint(25)
-            self.model.MaxConverterInvestmentMade = Constraint(
-                self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxConverterInvestmentMade)  # Constraint(26)
             # Additional constraint which states that there can be no link places between locations if there is no link between two locations. This is done such that there can only be links build between locations once ( for example: Link between Node_1 and Node_2 is allowed, but a link between Node_2 and Node_1 not. It is still alllowed to let flow go both ways)
-            self.model.NoFlowInvestmentMade = Constraint(
-                self.model.EnergyCarriers, self.model.Locations, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noFlowInvestmentMade)
             # Additional constraint. If there is not a possibility to place a link between two locations (so both ways not possible) there is no flow between these two locations. This only happens if the number of arcs is limited
-            self.model.NoAmountFlow = Constraint(self.model.EnergyCarriers, self.model.Locations,
-                                                 self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noAmountFlow)
-            self.model.MaxAmountStoredOut = Constraint(
-                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxAmountStoredOut)
-            self.model.MaxAmountStoredIn = Constraint(
-                self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxAmountStoredIn)
+            # (not needed in the sparse formulation, where these variables do not exist)
+            if(not self.sparse):
+                self.model.NoFlowInvestmentMade = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noFlowInvestmentMade)
+                self.model.NoAmountFlow = Constraint(self.model.EnergyCarriers, self.model.Locations,
+                                                     self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noAmountFlow)
+            if(self.storage_formulation == "StateOfCharge"):
+                self.model.StorageLevelBalance = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.storageLevelBalance)
+                self.model.MaxAmountStoredOut = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxAmountStoredOutLevel)
+                self.model.MinimumStoredConstraint = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.minimumStoredConstraint)
+                self.model.MaximumStoredConstraint = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maximumStoredConstraint)
+            else:
+                self.model.MaxAmountStoredOut = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxAmountStoredOut)
+                self.model.MaxAmountStoredIn = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxAmountStoredIn)
 #            self.model.StartConstraint = Constraint(self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule = ConstructionRules.startConstraint)
 
         else:
@@ -180,18 +298,78 @@ class Model:
                                                            self.model.TimePeriods, rule=ConstructionRules.maxConvertedConstraint)  # Constraint(12-14)
             self.model.MaxSupplyConstraint = Constraint(
                 self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxSupplyConstraint)  # Constraint(20-22)
-            self.model.MaxFlowInvestmentMade = Constraint(
-                self.model.EnergyCarriers, self.model.Edges, self.model.TimePeriods, rule=ConstructionRules.maxFlowInvestmentMade)  # Constraint(23)
-            self.model.MaxSupplyInvestmentMade = Constraint(
-                self.model.SupplyTypes, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxSupplyInvestmentMade)  # Constraint(24)
-            self.model.MaxConverterInvestmentMade = Constraint(
-                self.model.EnergyConverters, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.maxConverterInvestmentMade)  # Constraint(26)
-            self.model.NoFlowInvestmentMade = Constraint(
-                self.model.EnergyCarriers, self.model.Locations, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noFlowInvestmentMade)
-            self.model.NoAmountFlow = Constraint(self.model.EnergyCarriers, self.model.Locations,
-                                                 self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noAmountFlow)
+            if(not self.sparse):
+                self.model.NoFlowInvestmentMade = Constraint(
+                    self.model.EnergyCarriers, self.model.Locations, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noFlowInvestmentMade)
+                self.model.NoAmountFlow = Constraint(self.model.EnergyCarriers, self.model.Locations,
+                                                     self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noAmountFlow)
             self.model.NoStorage = Constraint(
                 self.model.EnergyCarriers, self.model.Locations, self.model.TimePeriods, rule=ConstructionRules.noStorage)
+
+    # Solution arrays
+    # The index sets of a variable family, one per axis of VariableArray
+    # (Edges and Arcs are one axis)
+    def VariableAxes(self, name):
+        return list(getattr(self.model, name).index_set().subsets())
+
+    def VariablePositions(self, name):
+        # Position of every index of the variable family along every axis, in
+        # the order of the variable: integer array (indices, axes)
+        variable = getattr(self.model, name)
+        positions = self._positions.get(name)
+        if(positions is not None and len(positions) == len(variable)):
+            return positions
+        axes = self.VariableAxes(name)
+        lookups = [{x: i for (i, x) in enumerate(axis)} for axis in axes]
+        dimens = [axis.dimen for axis in axes]
+        positions = np.empty((len(variable), len(axes)), dtype=np.intp)
+        for (row, index) in enumerate(variable.keys()):
+            start = 0
+            for (column, (lookup, dimen)) in enumerate(zip(lookups, dimens)):
+                key = index[start] if dimen == 1 else index[start:start + dimen]
+                positions[row, column] = lookup[key]
+                start += dimen
+        self._positions[name] = positions
+        return positions
+
+    def VariableArray(self, name, sparse=False):
+        # Values of a variable family as an array with one axis per index set
+        # (see VariableAxes), in the order of the sets; no value is NaN.
+        # With sparse, only the nonzero values: (positions, values), with the
+        # positions an integer array (values, axes).
+        variable = getattr(self.model, name)
+        values = np.array([x.value for x in variable.values()], dtype=float)
+        positions = self.VariablePositions(name)
+        if(sparse):
+            nonzero = np.nan_to_num(values) != 0
+            return positions[nonzero], values[nonzero]
+        array = np.full([len(axis) for axis in self.VariableAxes(name)],
+                        np.nan)
+        array[tuple(positions.T)] = values
+        return array
+
+    def VariableTotals(self, name, by=()):
+        # Sum of a variable family over all axes except the ones in by
+        # (names of the index sets, e.g. 'TimePeriods', or axis numbers);
+        # missing values count as 0. Returns a Series indexed by the kept
+        # sets, or a number if by is empty.
+        axes = self.VariableAxes(name)
+        names = [axis.name for axis in axes]
+        keep = [names.index(x) if isinstance(x, str) else x for x in by]
+        array = np.nan_to_num(self.VariableArray(name))
+        totals = array.sum(axis=tuple(i for i in range(len(axes))
+                                      if i not in keep))
+        if(not keep):
+            return float(totals)
+        # Put the kept axes in the order of by
+        totals = np.moveaxis(totals, list(np.argsort(np.argsort(keep))),
+                             list(range(len(keep))))
+        if(len(keep) == 1):
+            index = pd.Index(list(axes[keep[0]]), name=names[keep[0]])
+        else:
+            index = pd.MultiIndex.from_product(
+                [list(axes[i]) for i in keep], names=[names[i] for i in keep])
+        return pd.Series(totals.ravel(), index=index, name=name)
 # ------------------------------------------------------------------------------
 
 
@@ -227,9 +405,9 @@ class ConstructionRules:
             model.AmountSupplied[energy_type, location, time_period] + \
             ((1-model.LossFactor[energy_type]) *
              sum(model.AmountFlow[energy_type, location_from, location, time_period]
-                 for location_from in model.Locations if((location_from, location) in model.Arcs))) - \
+                 for location_from in model.InNeighbours[location])) - \
             sum(model.AmountFlow[energy_type, location, location_to, time_period]
-                for location_to in model.Locations if((location, location_to) in model.Arcs)) + \
+                for location_to in model.OutNeighbours[location]) + \
             sum(sum(model.AmountConverted[energy_type_2, energy_converter, location, time_period] * model.ConversionEfficiencies[energy_type, energy_type_2, energy_converter]
                     for energy_converter in model.EnergyConverters)
                 for energy_type_2 in model.EnergyCarriers) - \
@@ -238,17 +416,84 @@ class ConstructionRules:
             #model.Demand[energy_type, location, time_period] #== 0   #testing inequality
                          # before, demand was on the RHS, adjusted to what Julie used
 
+    # Installed capacity (number of units) in a time period: the earlier investments plus all investments made up to
+    # and including the time period. With the cumulative capacity formulation this is a single state variable.
+    # (TimePeriods are in chronological order, as in the TimePeriods sheet)
+    @staticmethod
+    def installedLines(model, energy_type, edge0, edge1, time_period):
+        if(hasattr(model, 'LineCapacity')):
+            return model.LineCapacity[energy_type, edge0, edge1, time_period]
+        return sum(model.LineInvestmentMade[energy_type, edge0, edge1, time_period2] for time_period2 in model.TimePeriods
+                   if(int(time_period2) <= int(time_period))) + model.EarlierLineInvestmentMade[energy_type, edge0, edge1]
+
+    @staticmethod
+    def installedSupply(model, supply_type, location, time_period):
+        if(hasattr(model, 'SupplyCapacity')):
+            return model.SupplyCapacity[supply_type, location, time_period]
+        return sum(model.SupplyInvestmentMade[supply_type, location, time_period2] for time_period2 in model.TimePeriods
+                   if(int(time_period2) <= int(time_period))) + model.EarlierSupplyInvestmentMade[supply_type, location]
+
+    @staticmethod
+    def installedConverters(model, energy_converter, location, time_period):
+        if(hasattr(model, 'ConverterCapacity')):
+            return model.ConverterCapacity[energy_converter, location, time_period]
+        return sum(model.ConverterInvestmentMade[energy_converter, location, time_period2] for time_period2 in model.TimePeriods
+                   if(int(time_period2) <= int(time_period))) + model.EarlierConverterInvestmentMade[energy_converter, location]
+
+    @staticmethod
+    def installedStorage(model, energy_type, location, time_period):
+        if(hasattr(model, 'StorageCapacity')):
+            return model.StorageCapacity[energy_type, location, time_period]
+        return sum(model.StorageInvestmentMade[energy_type, location, time_period2] for time_period2 in model.TimePeriods
+                   if(int(time_period2) <= int(time_period))) + model.EarlierStorageInvestmentMade[energy_type, location]
+
+    # Capacity state balances of the cumulative capacity formulation
+    @staticmethod
+    def lineCapacityBalance(model, energy_type, edge0, edge1, time_period):
+        if(time_period == model.TimePeriods.first()):
+            previous = model.EarlierLineInvestmentMade[energy_type, edge0, edge1]
+        else:
+            previous = model.LineCapacity[energy_type, edge0, edge1, model.TimePeriods.prev(time_period)]
+        return model.LineCapacity[energy_type, edge0, edge1, time_period] == \
+            previous + model.LineInvestmentMade[energy_type, edge0, edge1, time_period]
+
+    @staticmethod
+    def supplyCapacityBalance(model, supply_type, location, time_period):
+        if(time_period == model.TimePeriods.first()):
+            previous = model.EarlierSupplyInvestmentMade[supply_type, location]
+        else:
+            previous = model.SupplyCapacity[supply_type, location, model.TimePeriods.prev(time_period)]
+        return model.SupplyCapacity[supply_type, location, time_period] == \
+            previous + model.SupplyInvestmentMade[supply_type, location, time_period]
+
+    @staticmethod
+    def converterCapacityBalance(model, energy_converter, location, time_period):
+        if(time_period == model.TimePeriods.first()):
+            previous = model.EarlierConverterInvestmentMade[energy_converter, location]
+        else:
+            previous = model.ConverterCapacity[energy_converter, location, model.TimePeriods.prev(time_period)]
+        return model.ConverterCapacity[energy_converter, location, time_period] == \
+            previous + model.ConverterInvestmentMade[energy_converter, location, time_period]
+
+    @staticmethod
+    def storageCapacityBalance(model, energy_type, location, time_period):
+        if(time_period == model.TimePeriods.first()):
+            previous = model.EarlierStorageInvestmentMade[energy_type, location]
+        else:
+            previous = model.StorageCapacity[energy_type, location, model.TimePeriods.prev(time_period)]
+        return model.StorageCapacity[energy_type, location, time_period] == \
+            previous + model.StorageInvestmentMade[energy_type, location, time_period]
+
+    # The weather factor only scales the new investments, not the earlier ones
     @staticmethod
     def maxSupplyConstraint(model, energy_type, location, time_period):
         if(energy_type == 'Electricity'):
             return model.AmountSupplied[energy_type, location, time_period] <=\
-                sum(sum(model.SupplyInvestmentMade[supply_type, location,
-                    time_period2]*model.MaxEnergySupplied[energy_type, supply_type] *
-                    model.SupplyExternalFactor[supply_type, location, time_period] #attempted to add supply external factor, just for weather scenarios
-                        for supply_type in model.SupplyTypes) for time_period2 in
-                    model.TimePeriods if(int(time_period2) <= int(time_period))) + \
-                sum(model.EarlierSupplyInvestmentMade[supply_type, location] *
-                    model.MaxEnergySupplied[energy_type, supply_type]
+                sum(model.MaxEnergySupplied[energy_type, supply_type] *
+                    (model.SupplyExternalFactor[supply_type, location, time_period] * #attempted to add supply external factor, just for weather scenarios
+                     (ConstructionRules.installedSupply(model, supply_type, location, time_period) -
+                      model.EarlierSupplyInvestmentMade[supply_type, location]) +
+                     model.EarlierSupplyInvestmentMade[supply_type, location])
                     for supply_type in model.SupplyTypes)
         # new attempt to add gas in this supply constraint, used to only have the if for electricity and an else with 0
         elif(energy_type == 'Gas'):
@@ -261,16 +506,12 @@ class ConstructionRules:
     def maxFlowConstraint(model, energy_type, edge0, edge1, time_period):
         return \
             model.AmountFlow[energy_type, edge0, edge1, time_period] + model.AmountFlow[energy_type, edge1, edge0, time_period] <= \
-            (sum(model.LineInvestmentMade[energy_type, edge0, edge1, time_period2] for time_period2 in model.TimePeriods
-                 if(int(time_period2) <= int(time_period))) + model.EarlierLineInvestmentMade[energy_type, edge0, edge1])*model.MaxFlowLine[energy_type]
+            ConstructionRules.installedLines(model, energy_type, edge0, edge1, time_period)*model.MaxFlowLine[energy_type]
 
     @staticmethod
     def maxConvertedConstraint(model, energy_type, location, energy_converter, time_period):
         return \
-            (sum(model.ConverterInvestmentMade[energy_converter, location,
-                                               time_period2] for time_period2 in model.TimePeriods
-                 if(int(time_period2) <= int(time_period))) +
-             model.EarlierConverterInvestmentMade[energy_converter, location]) *\
+            ConstructionRules.installedConverters(model, energy_converter, location, time_period) *\
             model.MaxConverted[energy_type, energy_converter] >= \
             model.AmountConverted[energy_type,
                                   energy_converter, location, time_period]
@@ -279,10 +520,7 @@ class ConstructionRules:
     @staticmethod
     def maxAmountStoredIn(model, energy_type, location, time_period):
         return model.AmountStored_In[energy_type, location, time_period] <= \
-            sum(model.StorageInvestmentMade[energy_type, location,
-                                            time_period2]*model.MaxStorage[energy_type]
-                for time_period2 in model.TimePeriods
-                if(int(time_period2) <= int(time_period))) - \
+            ConstructionRules.installedStorage(model, energy_type, location, time_period)*model.MaxStorage[energy_type] - \
             sum(model.AmountStored_In[energy_type, location, time_period2] *
                 model.StorageLosses[energy_type]**(time_period-time_period2)
                 for time_period2 in model.TimePeriods
@@ -302,67 +540,53 @@ class ConstructionRules:
                 for time_period2 in model.TimePeriods
                 if(int(time_period2) < int(time_period)))
 
-    @staticmethod #adjusted slightly higher than with Julie, originally 0, 0, 1, 2, 3, 4; first whole run: 0,4,6,5,7,5,10
-    #20200825 scenario 5 is infeasible with 0,4,4,5,5,5. Doubling solar?
-    def maxSupplyInvestmentMade(model, supply_type, location, time_period):
-        if((supply_type == 'Wind') and ((location == 'Node_1') or (location == 'Node_5') or (location == 'Node_6'))):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] == 0
-        elif((supply_type == 'Wind') and (int(time_period) == 2018)):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 4
-        elif((supply_type == 'Solar') and (int(time_period) == 2018)):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 6
-        elif((supply_type == 'Wind') and (int(time_period) == 2020)):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 5
-        elif((supply_type == 'Solar') and (int(time_period) == 2020)):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 7
-#        elif((supply_type == 'Wind') and (time_period == '2022') or 
-#             (time_period == '2024') or (time_period == '2026') or
-#             (time_period == '2028') or (time_period == '2030')):
-#            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 5
-#        elif((supply_type == 'Solar') and (int(time_period) == 2022) | 
-#             (int(time_period) == 2024) | (int(time_period) == 2026) | 
-#             (int(time_period) == 2028) | (int(time_period) == 2030)):
-#            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 9
-        elif(supply_type == 'Wind'):
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 5
-        #elif(supply_type == 'Solar'):
-            #return model.SupplyInvestmentMade[supply_type, location, time_period] <= 10
-        else:
-            return model.SupplyInvestmentMade[supply_type, location, time_period] <= 8
+    # State-of-charge storage formulation. The storage level is the amount of energy in the storage at the start of a
+    # period. The storage starts empty, and what is left at the end of a period decays with the storage losses per year
+    # until the start of the next period.
+    @staticmethod
+    def storageLevelBalance(model, energy_type, location, time_period):
+        if(time_period == model.TimePeriods.first()):
+            return model.StorageLevel[energy_type, location, time_period] == 0
+        previous = model.TimePeriods.prev(time_period)
+        return model.StorageLevel[energy_type, location, time_period] == \
+            model.StorageLosses[energy_type]**(int(time_period)-int(previous)) * \
+            (model.StorageLevel[energy_type, location, previous] +
+             model.AmountStored_In[energy_type, location, previous] -
+             model.AmountStored_Out[energy_type, location, previous])
 
     @staticmethod
-    def maxFlowInvestmentMade(model, energy_type, edge0, edge1, time_period):
-        if(energy_type == 'Heat'):
-            return model.LineInvestmentMade[energy_type, edge0, edge1, time_period] <= 5
-        else:
-            # could be set to one for the other energy types
-            return model.LineInvestmentMade[energy_type, edge0, edge1, time_period] <= 5
+    def maxAmountStoredOutLevel(model, energy_type, location, time_period):
+        return model.AmountStored_Out[energy_type, location, time_period] <= \
+            model.StorageLevel[energy_type, location, time_period]
 
+    # Minimum and maximum level after storing in and taking out, per installed storage unit
     @staticmethod
-    def maxConverterInvestmentMade(model, energy_converter, location, time_period):
-        if(energy_converter == 'P2G'):
-            return model.ConverterInvestmentMade[energy_converter, location, time_period] <= 5
-        elif(energy_converter == 'HP'):
-            return model.ConverterInvestmentMade[energy_converter, location, time_period] <= 5
-        else:
-            return model.ConverterInvestmentMade[energy_converter, location, time_period] <= 5
+    def minimumStoredConstraint(model, energy_type, location, time_period):
+        return model.StorageLevel[energy_type, location, time_period] + \
+            model.AmountStored_In[energy_type, location, time_period] - \
+            model.AmountStored_Out[energy_type, location, time_period] >= \
+            ConstructionRules.installedStorage(model, energy_type, location, time_period)*model.MinStorage[energy_type]
 
     @staticmethod
-    def maxStorageInvestmentMade(model, energy_carrier, location, time_period):
-        return model.StorageInvestmentMade[energy_carrier, location, time_period] <= 5
+    def maximumStoredConstraint(model, energy_type, location, time_period):
+        return model.StorageLevel[energy_type, location, time_period] + \
+            model.AmountStored_In[energy_type, location, time_period] <= \
+            ConstructionRules.installedStorage(model, energy_type, location, time_period)*model.MaxStorage[energy_type]
 
 # ==========================
+    # The pinning rules only create rows for pairs that are not linked; for
+    # edges and arcs the '>= 0' row is already implied by the variable domain
     @staticmethod
     def noFlowInvestmentMade(model, energy_carrier, location_from, location_to, time_period):
         if((location_from, location_to) in model.Edges):
-            return model.LineInvestmentMade[energy_carrier, location_from, location_to, time_period] >= 0
+            return Constraint.Skip
         else:
             return model.LineInvestmentMade[energy_carrier, location_from, location_to, time_period] == 0
   
     @staticmethod
     def noAmountFlow(model, energy_carrier, location_from, location_to, time_period):
-        if((location_from, location_to) in model.Arcs):
-            return model.AmountFlow[energy_carrier, location_from, location_to, time_period] >= 0
+        if(location_to in model.OutNeighbours[location_from]):
+            return Constraint.Skip
         else:
             return model.AmountFlow[energy_carrier, location_from, location_to, time_period] == 0
 
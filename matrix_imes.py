@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Direct matrix assembly backend for the IMES model. MatrixModel has the same
+Initialize* methods as math_prog_imes.Model, but assembles the MILP
+(objective, balance, capacity, storage and investment limits) as sparse
+arrays with numpy broadcasting, instead of letting Pyomo call the
+ConstructionRules one index at a time. The problem can be written to an MPS
+file or solved directly through the scipy/HiGHS matrix interface, and the
+solution is mapped back to the same named variables and indices as in Model.
+
+The formulation is the sparse formulation of Model (lines on Edges, flows on
+Arcs) with the summed capacities and the "History" storage constraints, so it
+gives the same optimum as Model(sparse=True).
+"""
+import itertools
+
+import numpy as np
+import scipy.sparse as sp
+
+from investment_limits_imes import InvestmentLimits
+
+
+def _Flatten(combination):
+    # Pyomo style flat index: tuple elements (edges, arcs) are spliced in
+    key = []
+    for x in combination:
+        if(isinstance(x, tuple)):
+            key.extend(x)
+        else:
+            key.append(x)
+    return key[0] if len(key) == 1 else tuple(key)
+
+
+def IndexKeys(*axes):
+    # All index keys of a family, in the order of the flattened array
+    return [_Flatten(x) for x in itertools.product(*axes)]
+
+
+def ParamArray(values, *axes, default=None):
+    # Dense array of a parameter over the given axes. values is a dict keyed
+    # like the Pyomo Param, or a scalar that applies to every index.
+    shape = tuple(len(axis) for axis in axes)
+    if(not isinstance(values, dict)):
+        return np.full(shape, float(values))
+    if(default is None):
+        data = (values[key] for key in IndexKeys(*axes))
+    else:
+        data = (values.get(key, default) for key in IndexKeys(*axes))
+    return np.fromiter(data, dtype=float,
+                       count=int(np.prod(shape))).reshape(shape)
+
+
+class MatrixModel:
+
+    def __init__(self):
+        self.columns = {}  # name -> array of column numbers over the axes
+        self.axes = {}  # name -> list of axes (set orderings)
+        self.n_columns = 0
+        self.integer = []
+        self.lower = []
+        self.upper = []
+        self.objective = None
+        self.rows = {}  # name -> array of row numbers over the axes
+        self.n_rows = 0
+        self.row_lower = []
+        self.row_upper = []
+        self.entries = ([], [], [])  # COO rows, columns, values
+        self.solution = None
+        self.results = None
+
+    # -------------------------------------------------------------------------
+    # Sets and parameters, same arguments as Model
+    def InitializeSets(self, list_of_locations, list_of_energy_carriers,
+                       list_of_energy_converters, list_of_supply_types,
+                       list_of_edges, list_of_arcs, list_of_time_periods):
+        self.Locations = list(dict.fromkeys(list_of_locations))
+        self.EnergyCarriers = list(dict.fromkeys(list_of_energy_carriers))
+        self.EnergyConverters = list(dict.fromkeys(list_of_energy_converters))
+        self.SupplyTypes = list(dict.fromkeys(list_of_supply_types))
+        self.Edges = [tuple(x) for x in dict.fromkeys(list_of_edges)]
+        self.Arcs = [tuple(x) for x in dict.fromkeys(list_of_arcs)]
+        self.TimePeriods = list(dict.fromkeys(list_of_time_periods))
+
+        location_index = {x: i for i, x in enumerate(self.Locations)}
+        arc_index = {x: i for i, x in enumerate(self.Arcs)}
+        self.arc_from = np.array([location_index[x[0]] for x in self.Arcs],
+                                 dtype=int)
+        self.arc_to = np.array([location_index[x[1]] for x in self.Arcs],
+                               dtype=int)
+        self.edge_arc = np.array([arc_index[x] for x in self.Edges], dtype=int)
+        self.edge_reverse_arc = np.array([arc_index[(x[1], x[0])]
+                                          for x in self.Edges], dtype=int)
+        years = np.array([int(x) for x in self.TimePeriods])
+        self.years = years
+        # up_to[t, t2] = 1 if t2 <= t, before[t, t2] = 1 if t2 < t
+        self.up_to = (years[np.newaxis, :] <= years[:, np.newaxis])
+        self.before = (years[np.newaxis, :] < years[:, np.newaxis])
+
+    def CreateParametersFromDictionaries(self, network_costs, max_flow_line,
+                                         supply_investment_costs, supply_external_factor,
+                                         max_energy_supplied,
+                                         converter_investment_costs,
+                                         max_converted,
+                                         conversion_efficiencies, storage_costs,
+                                         storage_losses, min_stored, max_stored,
+                                         loss_factor, demand, amount_given,
+                                         earlier_line_investment_made,
+                                         earlier_supply_investment_made,
+                                         earlier_converter_investment_made,
+                                         earlier_storage_investment_made,
+                                         investment_limits=None):
+        EC, L, M, S = (self.EnergyCarriers, self.Locations,
+                       self.EnergyConverters, self.SupplyTypes)
+        D, T = self.Edges, self.TimePeriods
+        self.NetworkCosts = ParamArray(network_costs, EC, D, T)
+        self.MaxFlowLine = ParamArray(max_flow_line, EC)
+        self.LossFactor = ParamArray(loss_factor, EC)
+        self.SupplyInvestmentCosts = ParamArray(supply_investment_costs, S, T)
+        self.SupplyExternalFactor = ParamArray(supply_external_factor, S, L, T)
+        self.MaxEnergySupplied = ParamArray(max_energy_supplied, EC, S)
+        self.ConverterInvestmentCosts = ParamArray(converter_investment_costs,
+                                                   M, T)
+        self.MaxConverted = ParamArray(max_converted, EC, M)
+        self.ConversionEfficiencies = ParamArray(conversion_efficiencies,
+                                                 EC, EC, M)
+        self.StorageCosts = ParamArray(storage_costs, EC, T)
+        self.StorageLosses = ParamArray(storage_losses, EC)
+        self.MinStorage = ParamArray(min_stored, EC)
+        self.MaxStorage = ParamArray(max_stored, EC)
+        self.Demand = ParamArray(demand, EC, L, T)
+        self.AmountGiven = ParamArray(amount_given, EC, L, T)
+        self.EarlierLineInvestmentMade = ParamArray(
+            earlier_line_investment_made, EC, D, default=0)
+        self.EarlierSupplyInvestmentMade = ParamArray(
+            earlier_supply_investment_made, S, L, default=0)
+        self.EarlierConverterInvestmentMade = ParamArray(
+            earlier_converter_investment_made, M, L, default=0)
+        self.EarlierStorageInvestmentMade = ParamArray(
+            earlier_storage_investment_made, EC, L, default=0)
+        self.investment_limits = InvestmentLimits(investment_limits)
+
+    # -------------------------------------------------------------------------
+    # Matrix building blocks
+    def AddVariables(self, name, axes, integer, upper=np.inf):
+        shape = tuple(len(axis) for axis in axes)
+        size = int(np.prod(shape))
+        self.columns[name] = np.arange(self.n_columns,
+                                       self.n_columns + size).reshape(shape)
+        self.axes[name] = axes
+        self.n_columns += size
+        self.integer.append(np.full(size, integer, dtype=bool))
+        self.lower.append(np.zeros(size))
+        self.upper.append(np.broadcast_to(upper, shape).astype(float).ravel())
+        return self.columns[name]
+
+    def AddRows(self, name, shape, lower=-np.inf, upper=np.inf):
+        size = int(np.prod(shape))
+        self.rows[name] = np.arange(self.n_rows,
+                                    self.n_rows + size).reshape(shape)
+        self.n_rows += size
+        self.row_lower.append(np.broadcast_to(lower, shape).astype(float)
+                              .ravel())
+        self.row_upper.append(np.broadcast_to(upper, shape).astype(float)
+                              .ravel())
+        return self.rows[name]
+
+    def AddCoefficients(self, rows, columns, values, mask=None):
+        # rows, columns and values are broadcast against each other; entries
+        # outside mask or with a zero coefficient are dropped
+        rows, columns, values = np.broadcast_arrays(rows, columns, values)
+        keep = values != 0
+        if(mask is not None):
+            keep = keep & np.broadcast_to(mask, keep.shape)
+        self.entries[0].append(rows[keep])
+        self.entries[1].append(columns[keep])
+        self.entries[2].append(values[keep])
+
+    # -------------------------------------------------------------------------
+    # Variables, objective and constraints
+    def InitializeVariables(self):
+        EC, L, M, S = (self.EnergyCarriers, self.Locations,
+                       self.EnergyConverters, self.SupplyTypes)
+        D, A, T = self.Edges, self.Arcs, self.TimePeriods
+        self.AddVariables('LineInvestmentMade', [EC, D, T], True,
+                          self.InvestmentUpperBounds('LineInvestmentMade',
+                                                     EC, D, T))
+        self.AddVariables('SupplyInvestmentMade', [S, L, T], True,
+                          self.InvestmentUpperBounds('SupplyInvestmentMade',
+                                                     S, L, T))
+        self.AddVariables('ConverterInvestmentMade', [M, L, T], True,
+                          self.InvestmentUpperBounds(
+                              'ConverterInvestmentMade', M, L, T))
+        self.AddVariables('StorageInvestmentMade', [EC, L, T], True,
+                          self.InvestmentUpperBounds('StorageInvestmentMade',
+                                                     EC, L, T))
+        self.AddVariables('AmountSupplied', [EC, L, T], False)
+        self.AddVariables('AmountFlow', [EC, A, T], False)
+        self.AddVariables('AmountConverted', [EC, M, L, T], False)
+        self.AddVariables('AmountStored_In', [EC, L, T], False)
+        self.AddVariables('AmountStored_Out', [EC, L, T], False)
+
+    def InvestmentUpperBounds(self, name, *axes):
+        # The investment limits of a variable family (the same table as
+        # Model, see investment_limits_imes); no limit is inf
+        limits = (self.investment_limits.IndexLimit(name, key)
+                  for key in IndexKeys(*axes))
+        shape = tuple(len(axis) for axis in axes)
+        return np.fromiter((np.inf if x is None else x for x in limits),
+                           dtype=float, count=int(np.prod(shape)))\
+            .reshape(shape)
+
+    def InitializeObjective(self):
+        c = np.zeros(self.n_columns)
+        columns = self.columns
+        c[columns['LineInvestmentMade']] = self.NetworkCosts
+        c[columns['SupplyInvestmentMade']] = \
+            self.SupplyInvestmentCosts[:, np.newaxis, :]
+        c[columns['ConverterInvestmentMade']] = \
+            self.ConverterInvestmentCosts[:, np.newaxis, :]
+        c[columns['StorageInvestmentMade']] = \
+            self.StorageCosts[:, np.newaxis, :]
+        self.objective = c
+
+    def InitializeConstraints(self, with_or_without_storage):
+        self.BalanceRows()
+        self.MaxFlowRows()
+        self.MaxConvertedRows()
+        self.MaxSupplyRows()
+        if(with_or_without_storage == "With"):
+            self.StorageRows()
+        else:
+            n_ec, n_l, n_t = self.columns['AmountStored_In'].shape
+            rows = self.AddRows('NoStorage', (n_ec, n_l, n_t), 0, 0)
+            self.AddCoefficients(rows, self.columns['AmountStored_In'], 1.0)
+
+    def BalanceRows(self):
+        # Demand <= supplied + (1 - loss) * inflow - outflow + converted
+        #           - stored in + stored out
+        x = self.columns
+        n_ec, n_l, n_t = x['AmountSupplied'].shape
+        rows = self.AddRows('MassBalanceConstraint', (n_ec, n_l, n_t),
+                            lower=self.Demand)
+        self.AddCoefficients(rows, x['AmountSupplied'], 1.0)
+        flow = x['AmountFlow']  # (EC, A, T)
+        self.AddCoefficients(rows[:, self.arc_to, :], flow,
+                             (1 - self.LossFactor)[:, np.newaxis, np.newaxis])
+        self.AddCoefficients(rows[:, self.arc_from, :], flow, -1.0)
+        # converted[e2, m, l, t] * efficiency[e, e2, m] -> (E, E2, M, L, T)
+        self.AddCoefficients(
+            rows[:, np.newaxis, np.newaxis, :, :],
+            x['AmountConverted'][np.newaxis],
+            self.ConversionEfficiencies[:, :, :, np.newaxis, np.newaxis])
+        self.AddCoefficients(rows, x['AmountStored_In'], -1.0)
+        self.AddCoefficients(rows, x['AmountStored_Out'], 1.0)
+
+    def MaxFlowRows(self):
+        # flow(a, b) + flow(b, a) <= (sum of investments up to t + earlier)
+        #                            * max flow
+        x = self.columns
+        n_ec, n_d, n_t = x['LineInvestmentMade'].shape
+        max_flow = self.MaxFlowLine[:, np.newaxis]
+        rows = self.AddRows('MaxFlowConstraint', (n_ec, n_d, n_t),
+                            upper=(self.EarlierLineInvestmentMade *
+                                   max_flow)[:, :, np.newaxis])
+        self.AddCoefficients(rows, x['AmountFlow'][:, self.edge_arc, :], 1.0)
+        self.AddCoefficients(rows, x['AmountFlow'][:, self.edge_reverse_arc, :],
+                             1.0)
+        # (EC, D, T, T2)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             x['LineInvestmentMade'][:, :, np.newaxis, :],
+                             -max_flow[:, :, np.newaxis, np.newaxis],
+                             mask=self.up_to)
+
+    def MaxConvertedRows(self):
+        # converted <= (sum of investments up to t + earlier) * max converted
+        x = self.columns
+        n_ec, n_m, n_l, n_t = x['AmountConverted'].shape
+        max_converted = self.MaxConverted[:, np.newaxis, :, np.newaxis]
+        earlier = self.EarlierConverterInvestmentMade.T[np.newaxis, :, :,
+                                                        np.newaxis]
+        rows = self.AddRows('MaxConvertedConstraint', (n_ec, n_l, n_m, n_t),
+                            upper=earlier * max_converted)
+        self.AddCoefficients(rows, x['AmountConverted'].transpose(0, 2, 1, 3),
+                             1.0)
+        # (EC, L, M, T, T2)
+        investments = x['ConverterInvestmentMade'].transpose(1, 0, 2)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             investments[np.newaxis, :, :, np.newaxis, :],
+                             -max_converted[..., np.newaxis],
+                             mask=self.up_to)
+
+    def MaxSupplyRows(self):
+        x = self.columns
+        n_ec, n_l, n_t = x['AmountSupplied'].shape
+        upper = np.zeros((n_ec, n_l, n_t))
+        lower = np.full((n_ec, n_l, n_t), -np.inf)
+        for e, energy_type in enumerate(self.EnergyCarriers):
+            if(energy_type == 'Electricity'):
+                upper[e] = (self.EarlierSupplyInvestmentMade *
+                            self.MaxEnergySupplied[e][:, np.newaxis])\
+                    .sum(axis=0)[:, np.newaxis]
+            elif(energy_type == 'Gas'):
+                upper[e] = self.AmountGiven[e]
+            elif(energy_type == 'Heat'):
+                lower[e] = 0
+            else:
+                raise ValueError("No supply rule for energy carrier %s"
+                                 % energy_type)
+        rows = self.AddRows('MaxSupplyConstraint', (n_ec, n_l, n_t),
+                            lower=lower, upper=upper)
+        self.AddCoefficients(rows, x['AmountSupplied'], 1.0)
+        if('Electricity' in self.EnergyCarriers):
+            e = self.EnergyCarriers.index('Electricity')
+            # (S, L, T, T2): -max supplied * external factor(t) * investment(t2)
+            values = -(self.MaxEnergySupplied[e][:, np.newaxis, np.newaxis] *
+                       self.SupplyExternalFactor)[..., np.newaxis]
+            self.AddCoefficients(
+                rows[e][np.newaxis, :, :, np.newaxis],
+                x['SupplyInvestmentMade'][:, :, np.newaxis, :],
+                values, mask=self.up_to)
+
+    def StorageRows(self):
+        x = self.columns
+        stored_in, stored_out = x['AmountStored_In'], x['AmountStored_Out']
+        n_ec, n_l, n_t = stored_in.shape
+        # losses[e, t, t2] = StorageLosses[e]^(t - t2) for t2 < t
+        exponents = (self.years[:, np.newaxis] - self.years[np.newaxis, :])
+        losses = np.where(self.before,
+                          self.StorageLosses[:, np.newaxis, np.newaxis] **
+                          np.maximum(exponents, 0), 0.0)
+        losses = losses[:, np.newaxis]  # (EC, 1, T, T2)
+
+        # out(t) <= sum_{t2<t} in(t2) * losses^(t-t2) - sum_{t2<t} out(t2)
+        rows = self.AddRows('MaxAmountStoredOut', (n_ec, n_l, n_t), upper=0)
+        self.AddCoefficients(rows, stored_out, 1.0)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             stored_in[:, :, np.newaxis, :], -losses)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             stored_out[:, :, np.newaxis, :], 1.0,
+                             mask=self.before)
+
+        # in(t) <= installed storage * max storage - stored amount
+        max_storage = self.MaxStorage[:, np.newaxis]
+        rows = self.AddRows('MaxAmountStoredIn', (n_ec, n_l, n_t),
+                            upper=(self.EarlierStorageInvestmentMade *
+                                   max_storage)[:, :, np.newaxis])
+        self.AddCoefficients(rows, stored_in, 1.0)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             x['StorageInvestmentMade'][:, :, np.newaxis, :],
+                             -max_storage[:, :, np.newaxis, np.newaxis],
+                             mask=self.up_to)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             stored_in[:, :, np.newaxis, :], losses)
+        self.AddCoefficients(rows[..., np.newaxis],
+                             stored_out[:, :, np.newaxis, :], -1.0,
+                             mask=self.before)
+
+    # -------------------------------------------------------------------------
+    # Assembled problem
+    def Matrix(self):
+        # CSR constraint matrix; duplicate entries (for example flows on a
+        # self loop) are summed, like Pyomo collects repeated terms
+        rows, columns, values = (np.concatenate(x) for x in self.entries)
+        return sp.csr_matrix((values, (rows, columns)),
+                             shape=(self.n_rows, self.n_columns))
+
+    def Arrays(self):
+        # c, A, row bounds, column bounds and integrality in one dict
+        return {'c': self.objective, 'A': self.Matrix(),
+                'row_lower': np.concatenate(self.row_lower),
+                'row_upper': np.concatenate(self.row_upper),
+                'lower': np.concatenate(self.lower),
+                'upper': np.concatenate(self.upper),
+                'integer': np.concatenate(self.integer)}
+
+    def ColumnNames(self):
+        # Solver column name -> (variable name, index)
+        names = {}
+        for name, columns in self.columns.items():
+            for column, key in zip(columns.ravel(),
+                                   IndexKeys(*self.axes[name])):
+                names['x%d' % column] = (name, key)
+        return names
+
+    def WriteMPS(self, file_name):
+        # Free format MPS with generic column (x#) and row (r#) names; see
+        # ColumnNames for the mapping back to the variables
+        arrays = self.Arrays()
+        A = arrays['A'].tocsc()
+        A.sum_duplicates()
+        row_lower, row_upper = arrays['row_lower'], arrays['row_upper']
+        with open(file_name, 'w') as f:
+            f.write('NAME IMES\nROWS\n N  COST\n')
+            for i in range(self.n_rows):
+                if(row_lower[i] == row_upper[i]):
+                    sense = 'E'
+                elif(np.isinf(row_lower[i])):
+                    sense = 'L'
+                else:
+                    sense = 'G'
+                f.write(' %s  r%d\n' % (sense, i))
+            f.write('COLUMNS\n')
+            integer_block = False
+            for j in range(self.n_columns):
+                if(arrays['integer'][j] != integer_block):
+                    integer_block = arrays['integer'][j]
+                    f.write("    MARKER 'MARKER' '%s'\n" %
+                            ('INTORG' if integer_block else 'INTEND'))
+                if(arrays['c'][j] != 0):
+                    f.write('    x%d COST %.17g\n' % (j, arrays['c'][j]))
+                for k in range(A.indptr[j], A.indptr[j + 1]):
+                    f.write('    x%d r%d %.17g\n' % (j, A.indices[k],
+                                                     A.data[k]))
+                if(arrays['c'][j] == 0 and A.indptr[j] == A.indptr[j + 1]):
+                    # keep empty columns so that the numbering is complete
+                    f.write('    x%d COST 0\n' % j)
+            if(integer_block):
+                f.write("    MARKER 'MARKER' 'INTEND'\n")
+            f.write('RHS\n')
+            for i in range(self.n_rows):
+                rhs = row_upper[i] if np.isinf(row_lower[i]) else row_lower[i]
+                if(rhs != 0):
+                    f.write('    RHS r%d %.17g\n' % (i, rhs))
+            f.write('RANGES\n')
+            for i in range(self.n_rows):
+                if(np.isfinite(row_lower[i]) and np.isfinite(row_upper[i])
+                   and row_lower[i] != row_upper[i]):
+                    f.write('    RNG r%d %.17g\n' % (i, row_upper[i] -
+                                                     row_lower[i]))
+            f.write('BOUNDS\n')
+            for j in range(self.n_columns):
+                lower, upper = arrays['lower'][j], arrays['upper'][j]
+                if(lower == upper):
+                    f.write(' FX BND x%d %.17g\n' % (j, lower))
+                    continue
+                if(lower != 0):
+                    f.write(' LO BND x%d %.17g\n' % (j, lower))
+                if(np.isfinite(upper)):
+                    f.write(' UP BND x%d %.17g\n' % (j, upper))
+                elif(arrays['integer'][j]):
+                    # explicit, some readers default integers to binary
+                    f.write(' PL BND x%d\n' % j)
+            f.write('ENDATA\n')
+        return file_name
+
+    def Solve(self, time_limit=None, mip_gap=0.001, tee=True):
+        # Solve through the HiGHS matrix interface of scipy
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        arrays = self.Arrays()
+        options = {'disp': tee, 'mip_rel_gap': mip_gap}
+        if(time_limit is not None):
+            options['time_limit'] = time_limit
+        self.results = milp(
+            arrays['c'], integrality=arrays['integer'].astype(int),
+            bounds=Bounds(arrays['lower'], arrays['upper']),
+            constraints=LinearConstraint(arrays['A'], arrays['row_lower'],
+                                         arrays['row_upper']),
+            options=options)
+        self.solution = self.results.x
+        return self.results
+
+    def Solution(self, x=None):
+        # Variable name -> {index: value}, indexed like the Pyomo variables
+        x = self.solution if x is None else x
+        return {name: dict(zip(IndexKeys(*self.axes[name]),
+                               x[columns.ravel()].tolist()))
+                for name, columns in self.columns.items()}
+
+    def LoadSolution(self, model, x=None):
+        # Set the values of a math_prog_imes.Model built on the same data, so
+        # the existing exports can be used. Indices that do not exist in the
+        # matrix model (non-edges of the dense formulation) are set to zero.
+        for name, values in self.Solution(x).items():
+            variable = getattr(model.model, name)
+            for index in variable:
+                variable[index].set_value(values.get(index, 0),
+                                          skip_validation=True)
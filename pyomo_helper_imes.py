@@ -5,16 +5,42 @@ Created on Thu Mar  7 16:15:29 2019
 @author: JanGr
 """
 
-from pyomo.environ import SolverFactory
-from pyomo.opt.parallel import SolverManagerFactory
+import json
+import multiprocessing
+import os
+import signal
+import time
+from queue import Empty
+
+from pyomo.environ import Constraint, Objective
+from pyomo.common.collections import ComponentMap, ComponentSet
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.repn import generate_standard_repn
 import pandas as pd
 
+from instrumentation_imes import Instrumented, Annotate
+from solvers_imes import (CreateSolver, SolverName, AvailableSolver,
+                          DEFAULT_PROFILE, SOLVER_PREFERENCE)
+
+# Integer investment variables, used as MIP start of a related solve
+INVESTMENT_VARIABLES = ['LineInvestmentMade', 'SupplyInvestmentMade',
+                        'ConverterInvestmentMade', 'StorageInvestmentMade']
+
 
-def RunningLocalServer(model, solver_name, time_limit):
-    solver = SolverFactory(solver_name)
-    solver.options['timelimit'] = time_limit
-    solver.options['mipgap'] = 0.001  # Set optimality gap to 2.5%
-    #kept at 7% as Julie did, to align with her results; now trying 2,5%
+@Instrumented('solve')
+def RunningLocalServer(model, solver_name, time_limit, threads=None, tee=True,
+                       warm_start=None, profile=DEFAULT_PROFILE,
+                       load_solutions=True, **options):
+    # solver_name: Pyomo solver name, or 'auto' for the first installed one
+    # load_solutions=False: do not load the solution into the model (see
+    # LoadSolution); some solvers (appsi) raise when there is no solution
+    # to load, e.g. for an infeasible model or at the time limit
+    # profile and options (mip_gap, presolve, mip_emphasis): see solvers_imes
+    # The profile sets the optimality gap ("production": 0.1%)
+    # Limit the solver threads, e.g. when several solves run in parallel
+    solver_name = SolverName(solver_name)
+    solver = CreateSolver(solver_name, profile, time_limit=time_limit,
+                          threads=threads, **options)
 
 # =============================================================================
 #     analysis = pd.DataFrame()
@@ -30,16 +56,101 @@ def RunningLocalServer(model, solver_name, time_limit):
 #     analysis = [time,lb,ub,gap]
 # =============================================================================
 
-    output = solver.solve(model, tee=True)
+    # Start from the investments of a related solve (see LoadWarmStart)
+    if(warm_start is not None and solver.warm_start_capable()):
+        LoadWarmStart(model, warm_start)
+        output = solver.solve(model, tee=tee, warmstart=True,
+                              load_solutions=load_solutions)
+    else:
+        output = solver.solve(model, tee=tee, load_solutions=load_solutions)
+    # Time of the solver itself; the rest of the solve phase is writing and
+    # reading the problem and solution
+    solver_seconds = None
+    for name in ['wallclock_time', 'time']:
+        try:
+            solver_seconds = float(getattr(output.solver, name))
+            break
+        except (AttributeError, TypeError, ValueError):
+            pass
+    Annotate(solver_name=solver_name, solver_seconds=solver_seconds,
+             termination_condition=str(output.solver.termination_condition))
 
     return output  # , analysis
 
 
 def RunningOnlineServer(model, server_name, solver_name):
+    from pyomo.opt.parallel import SolverManagerFactory
     solver_manager = SolverManagerFactory(server_name)
     return solver_manager.solve(model, opt=solver_name)
 
 
+# Keeps a model loaded in a persistent solver (e.g. gurobi_persistent or
+# appsi_highs), so that what-if solves only push the changed mutable
+# parameters to the solver instead of rebuilding and writing the model.
+# Usage:
+#   server = PersistentServer(model.model, 'gurobi_persistent', 100)
+#   server.Solve()
+#   server.SetParameters({'Demand': {('Heat', 'Node_1', 2030): 2.5}})
+#   server.Solve()
+class PersistentServer:
+
+    def __init__(self, model, solver_name, time_limit, threads=None,
+                 profile=DEFAULT_PROFILE, **options):
+        self.model = model
+        self.solver = CreateSolver(solver_name, profile,
+                                   time_limit=time_limit, threads=threads,
+                                   **options)
+        # appsi solvers detect changed parameters themselves; the other
+        # persistent solvers need the constraints that use them re-added
+        self.automatic_updates = hasattr(self.solver, 'update_params')
+        self.solver.set_instance(model)
+        # Parameter -> constraints using it, and the parameters of the
+        # objective; built on the first parameter change
+        self._constraints = None
+        self._objective_parameters = None
+
+    def _IndexParameters(self):
+        self._constraints = ComponentMap()
+        for constraint in self.model.component_data_objects(Constraint,
+                                                            active=True):
+            for parameter in identify_mutable_parameters(constraint.expr):
+                self._constraints.setdefault(parameter, []).append(constraint)
+        self._objective_parameters = ComponentSet()
+        for objective in self.model.component_data_objects(Objective,
+                                                           active=True):
+            self._objective_parameters.update(
+                identify_mutable_parameters(objective.expr))
+
+    # Change mutable parameters: parameter name -> {index: value}
+    def SetParameters(self, values):
+        changed = []
+        for (name, parameter_values) in values.items():
+            parameter = getattr(self.model, name)
+            for (index, value) in parameter_values.items():
+                parameter[index] = value
+                changed.append(parameter[index])
+        if(self.automatic_updates):
+            self.solver.update_params()
+            return
+
+        if(self._constraints is None):
+            self._IndexParameters()
+        constraints = ComponentSet()
+        for parameter in changed:
+            constraints.update(self._constraints.get(parameter, []))
+        for constraint in constraints:
+            self.solver.remove_constraint(constraint)
+            self.solver.add_constraint(constraint)
+        if(any(x in self._objective_parameters for x in changed)):
+            self.solver.set_objective(next(self.model.component_data_objects(
+                Objective, active=True)))
+
+    def Solve(self, tee=False):
+        if(self.automatic_updates):
+            return self.solver.solve(self.model, tee=tee)
+        return self.solver.solve(tee=tee, load_solutions=True)
+
+
 def PrintResult(results, objective):
     results.write()
 
@@ -48,3 +159,250 @@ def PrintResult(results, objective):
 
     # Print the cost of the objective
     print("Objective = %f" % objective(objective))
+
+
+# Number of nonzeros (variables with a coefficient) per constraint block
+def CountNonzeros(model, constraint_names=None):
+    nonzeros = {}
+    for constraint in model.component_objects(Constraint, active=True):
+        if(constraint_names is not None and
+           constraint.name not in constraint_names):
+            continue
+        nonzeros[constraint.name] = 0
+        for x in constraint:
+            repn = generate_standard_repn(constraint[x].body,
+                                          compute_values=False)
+            nonzeros[constraint.name] += len(repn.linear_vars) + \
+                len(repn.quadratic_vars)
+    return nonzeros
+
+
+# Solution statuses of a feasible solution (an optimal one, or the best one
+# found at a limit)
+FEASIBLE_SOLUTION_STATUSES = ['optimal', 'globallyOptimal', 'locallyOptimal',
+                              'feasible', 'bestSoFar', 'stoppedByLimit']
+
+
+# Load the solution of a solve with load_solutions=False into the model;
+# returns False when the solver found no feasible solution (some solvers
+# return the infeasible point of a failed solve as a solution)
+def LoadSolution(model, output):
+    if(len(output.solution) == 0 or str(output.solution(0).status)
+       not in FEASIBLE_SOLUTION_STATUSES):
+        return False
+    model.solutions.load_from(output)
+    return True
+
+
+# Values of the investment variables of a solved model:
+# variable name -> {index: value}
+def InvestmentSolution(model):
+    return {name: getattr(model, name).extract_values()
+            for name in INVESTMENT_VARIABLES if hasattr(model, name)}
+
+
+# Save the investment variables of a solved model to a json file
+def SaveSolution(model, file_name):
+    solution = {name: [[list(index) if isinstance(index, tuple) else index,
+                        value] for (index, value) in values.items()]
+                for (name, values) in InvestmentSolution(model).items()}
+    with open(file_name, 'w') as f:
+        json.dump(solution, f)
+
+
+def ReadSolution(file_name):
+    with open(file_name) as f:
+        solution = json.load(f)
+    return {name: {tuple(index) if isinstance(index, list) else index: value
+                   for (index, value) in values}
+            for (name, values) in solution.items()}
+
+
+# Load the investments of a previous solve as starting values of a model.
+# warm_start is a solved model, a file written by SaveSolution or a dict as
+# returned by InvestmentSolution. Indices that the model does not have
+# (e.g. another network) are skipped. Returns the number of values loaded.
+def LoadWarmStart(model, warm_start):
+    if(isinstance(warm_start, str)):
+        warm_start = ReadSolution(warm_start)
+    elif(not isinstance(warm_start, dict)):
+        warm_start = InvestmentSolution(getattr(warm_start, 'model',
+                                                warm_start))
+    loaded = 0
+    for (name, values) in warm_start.items():
+        if(not hasattr(model, name)):
+            continue
+        variable = getattr(model, name)
+        for (index, value) in values.items():
+            if(value is not None and index in variable):
+                variable[index].set_value(round(value), skip_validation=True)
+                loaded += 1
+    return loaded
+
+
+# =============================================================================
+# Portfolio: several solver configurations race on the same model in
+# parallel processes; the first one that finishes with a solution (within the
+# target gap, or with the best solution at the time limit) wins and the
+# others are stopped. The solution of the winner is loaded into the model.
+# A configuration: {'name': ..., 'solver_name': ..., 'profile': ...,
+#                   'options': {'mip_emphasis': 'feasibility', 'seed': 1}}
+# Usage:
+#   report = RunningPortfolio(model.model, DefaultPortfolio(), 100,
+#                             target_gap=0.01, log_file='portfolio.csv')
+#   print(report['winner'])
+#   print(PortfolioStatistics('portfolio.csv'))
+# =============================================================================
+def DefaultPortfolio(solver_names=None, seeds=(0, 1)):
+    # Feasibility and optimality emphasis with a few seeds, for every
+    # installed solver of solver_names (default: SOLVER_PREFERENCE)
+    configurations = []
+    for solver_name in solver_names or SOLVER_PREFERENCE:
+        try:
+            AvailableSolver([solver_name])
+        except RuntimeError:
+            continue
+        for mip_emphasis in ['feasibility', 'optimality']:
+            for seed in seeds:
+                configurations.append({
+                    'name': '%s-%s-%d' % (solver_name, mip_emphasis, seed),
+                    'solver_name': solver_name,
+                    'options': {'mip_emphasis': mip_emphasis,
+                                'seed': seed}})
+    return configurations
+
+
+def _SolvePortfolioMember(model, configuration, time_limit, target_gap,
+                          threads, queue):
+    # Runs in a child process; puts (name, summary, variable values) on the
+    # queue. The process gets its own process group, so that a solver that
+    # runs as a separate executable is stopped together with it.
+    if(hasattr(os, 'setpgrp')):
+        os.setpgrp()
+    from pyomo.environ import Var, value
+    start = time.perf_counter()
+    summary = {'termination_condition': None, 'objective': None,
+               'lower_bound': None}
+    values = None
+    try:
+        solver = CreateSolver(configuration['solver_name'],
+                              configuration.get('profile', DEFAULT_PROFILE),
+                              time_limit=time_limit, mip_gap=target_gap,
+                              threads=threads,
+                              **configuration.get('options', {}))
+        output = solver.solve(model, tee=False)
+        summary['termination_condition'] = \
+            str(output.solver.termination_condition)
+        summary['lower_bound'] = output.problem.lower_bound
+        summary['objective'] = value(model.Cost, exception=False)
+        if(summary['objective'] is not None):
+            values = {variable.name: variable.extract_values()
+                      for variable in model.component_objects(Var)}
+    except Exception as error:
+        summary['termination_condition'] = 'error: %s' % error
+    summary['seconds'] = time.perf_counter() - start
+    queue.put((configuration['name'], summary, values))
+
+
+def _StopProcess(process):
+    if(not process.is_alive()):
+        return
+    if(hasattr(os, 'killpg')):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            process.terminate()
+    else:
+        process.terminate()
+    process.join()
+
+
+@Instrumented('solve')
+def RunningPortfolio(model, configurations, time_limit, target_gap=None,
+                     threads=1, log_file=None, grace_seconds=60):
+    # model: Pyomo model, which is copied to every process
+    # target_gap: optimality gap at which a configuration stops (default:
+    # the gap of its profile)
+    # threads: solver threads per configuration
+    # log_file: csv file to which a row per configuration is appended, see
+    # PortfolioStatistics
+    # Returns a report with the winner and the summary of every
+    # configuration; without any solution the winner is None
+    names = [x['name'] for x in configurations]
+    if(len(set(names)) != len(names)):
+        raise ValueError("Portfolio configuration names must be unique")
+    context = multiprocessing.get_context()
+    queue = context.Queue()
+    processes = {x['name']: context.Process(
+        target=_SolvePortfolioMember,
+        args=(model, x, time_limit, target_gap, threads, queue), daemon=True)
+        for x in configurations}
+    start = time.perf_counter()
+    for process in processes.values():
+        process.start()
+
+    # Wait for the first solution; configurations that end without one drop
+    # out of the race
+    summaries = {}
+    winner = None
+    values = None
+    deadline = start + time_limit + grace_seconds
+    while(winner is None and len(summaries) < len(processes)):
+        try:
+            (name, summary, member_values) = queue.get(
+                timeout=max(deadline - time.perf_counter(), 0.1))
+        except Empty:
+            break
+        summary['status'] = 'finished'
+        summaries[name] = summary
+        if(member_values is not None):
+            winner = name
+            values = member_values
+            summary['status'] = 'winner'
+    for (name, process) in processes.items():
+        _StopProcess(process)
+        if(name not in summaries):
+            summaries[name] = {'status': 'stopped', 'termination_condition':
+                               None, 'objective': None, 'lower_bound': None,
+                               'seconds': time.perf_counter() - start}
+
+    # Load the solution of the winner
+    if(values is not None):
+        for (name, variable_values) in values.items():
+            variable = getattr(model, name)
+            for (index, value) in variable_values.items():
+                variable[index].set_value(value, skip_validation=True)
+
+    configurations = {x['name']: x for x in configurations}
+    report = {'winner': winner,
+              'configuration': configurations.get(winner),
+              'seconds': time.perf_counter() - start,
+              'configurations': [dict(name=name, **summaries[name])
+                                 for name in names]}
+    Annotate(solver_name=winner and configurations[winner]['solver_name'],
+             portfolio_winner=winner,
+             termination_condition=winner and
+             summaries[winner]['termination_condition'])
+    if(log_file is not None):
+        rows = pd.DataFrame(report['configurations'])
+        rows.insert(0, 'time', pd.Timestamp.now().isoformat())
+        rows['solver_name'] = [configurations[x]['solver_name']
+                               for x in rows['name']]
+        rows.to_csv(log_file, mode='a', index=False,
+                    header=not os.path.exists(log_file))
+    return report
+
+
+def PortfolioStatistics(log_file):
+    # Races, wins and median seconds of the wins per configuration, from
+    # the log of RunningPortfolio; the most winning configurations first
+    rows = pd.read_csv(log_file)
+    rows['won'] = rows['status'] == 'winner'
+    statistics = rows.groupby('name').agg(
+        solver_name=('solver_name', 'first'), races=('won', 'size'),
+        wins=('won', 'sum'))
+    statistics['win_rate'] = statistics['wins'] / statistics['races']
+    statistics['median_win_seconds'] = \
+        rows[rows['won']].groupby('name')['seconds'].median()
+    return statistics.sort_values(['wins', 'median_win_seconds'],
+                                  ascending=[False, True])
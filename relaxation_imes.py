@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Fast approximate planning: the LP relaxation of the model (investment
+variables continuous) is solved, and its investments are rounded to an
+integer plan, which is checked and improved with LP solves of the model
+with the investments fixed.
+
+Rounding is done on the installed capacity: the cumulative number of
+investments of every type and location is rounded up in every time period,
+and the investments are the increments. The installed capacity is then at
+least the capacity of the LP solution in every period, so the plan is
+feasible, and the investments stay within their (integer) bounds. The
+improvement step removes single investments (the most expensive first) as
+long as the operation stays feasible.
+
+The report gives the LP bound and the gap of the plan against it, which
+bounds the gap to the optimal integer plan.
+
+Usage:
+    investments, report = SolveRelaxAndRound(case)
+    print(report['objective'], report['gap'])
+"""
+import math
+import time
+
+from pyomo.environ import NonNegativeReals, NonNegativeIntegers, value
+
+from case_imes import BuildModel
+from pyomo_helper_imes import INVESTMENT_VARIABLES, InvestmentSolution
+from rolling_horizon_imes import InvestmentCost
+from solvers_imes import CreateSolver
+
+# Fractions below this are rounded down (LP solutions are not exact)
+ROUNDING_TOLERANCE = 1e-6
+
+
+def RelaxInvestments(model, relax=True):
+    # Make the investment variables continuous (or integer again)
+    domain = NonNegativeReals if relax else NonNegativeIntegers
+    for name in INVESTMENT_VARIABLES:
+        if(hasattr(model, name)):
+            getattr(model, name).domain = domain
+
+
+def RoundInvestments(investments, time_periods, tolerance=ROUNDING_TOLERANCE):
+    # Integer investments (variable name -> {index: number}) with, in every
+    # time period, the cumulative investments of the LP solution rounded up
+    order = {x: i for (i, x) in enumerate(time_periods)}
+    rounded = {}
+    for (name, values) in investments.items():
+        rounded[name] = {}
+        series = {}
+        for (index, number) in values.items():
+            series.setdefault(index[:-1], []).append((index[-1], number or 0))
+        for (key, numbers) in series.items():
+            cumulative = 0
+            installed = 0
+            for (time_period, number) in sorted(
+                    numbers, key=lambda x: order[x[0]]):
+                cumulative += number
+                capacity = math.ceil(cumulative - tolerance)
+                rounded[name][key + (time_period,)] = max(capacity -
+                                                          installed, 0)
+                installed = max(capacity, installed)
+    return rounded
+
+
+def _FixInvestments(model, investments):
+    for (name, values) in investments.items():
+        variable = getattr(model, name)
+        for (index, number) in values.items():
+            variable[index].fix(number)
+
+
+def _Feasible(solver, model):
+    output = solver.solve(model, load_solutions=False)
+    return str(output.solver.termination_condition) == 'optimal'
+
+
+def RelaxAndRound(model, case, solver_name='auto', time_limit=100,
+                  threads=None, improve=True, max_improvements=20):
+    # model: Model of the case (see case_imes.BuildModel), which is solved
+    # with the rounded investments fixed
+    # improve: try to remove single investments, at most max_improvements
+    # LP solves
+    # Returns the investments and a report
+    m = model.model
+    solver = CreateSolver(solver_name, profile=None, time_limit=time_limit,
+                          threads=threads)
+    report = {}
+
+    # LP relaxation
+    start = time.perf_counter()
+    RelaxInvestments(m)
+    output = solver.solve(m)
+    report['lp_termination_condition'] = \
+        str(output.solver.termination_condition)
+    report['lp_bound'] = value(m.Cost, exception=False)
+    report['lp_seconds'] = time.perf_counter() - start
+    if(report['lp_bound'] is None):
+        raise RuntimeError("LP relaxation not solved (%s)"
+                           % report['lp_termination_condition'])
+
+    # Rounding and improvement, with the investments fixed
+    start = time.perf_counter()
+    investments = RoundInvestments(InvestmentSolution(m),
+                                   case['time_periods'])
+    RelaxInvestments(m, relax=False)
+    _FixInvestments(m, investments)
+    if(not _Feasible(solver, m)):
+        raise RuntimeError("Rounded investments are not feasible")
+    improvements = 0
+    tries = 0
+    if(improve):
+        candidates = sorted(
+            ((InvestmentCost(case, name, index), name, index)
+             for (name, values) in investments.items()
+             for (index, number) in values.items() if number > 0),
+            key=lambda x: -x[0])
+        for (cost, name, index) in candidates:
+            if(tries >= max_improvements):
+                break
+            tries += 1
+            investments[name][index] -= 1
+            _FixInvestments(m, {name: {index: investments[name][index]}})
+            if(_Feasible(solver, m)):
+                improvements += 1
+            else:
+                investments[name][index] += 1
+                _FixInvestments(m, {name: {index: investments[name][index]}})
+    # Final solve for the values of the operational variables
+    output = solver.solve(m)
+    report['termination_condition'] = \
+        str(output.solver.termination_condition)
+    report['objective'] = value(m.Cost)
+    report['gap'] = (report['objective'] - report['lp_bound']) / \
+        max(abs(report['objective']), 1e-10)
+    report['improvements'] = improvements
+    report['repair_seconds'] = time.perf_counter() - start
+    return investments, report
+
+
+def SolveRelaxAndRound(case, with_or_without_storage="With",
+                       solver_name='auto', time_limit=100, threads=None,
+                       formulation=None, improve=True, max_improvements=20):
+    # case: see case_imes.BuildCaseData
+    # Returns the investments (variable name -> {index: number}) and a report
+    start = time.perf_counter()
+    model = BuildModel(case, with_or_without_storage,
+                       **(formulation or {'sparse': True}))
+    investments, report = RelaxAndRound(model, case, solver_name, time_limit,
+                                        threads, improve, max_improvements)
+    report['seconds'] = time.perf_counter() - start
+    return investments, report
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Rolling horizon (myopic) solve of the IMES model: a window of a few time
+periods is solved, the investments of the first period(s) of the window are
+fixed and added to the Earlier*InvestmentMade parameters, and the window moves
+on. Every step is a MIP of bounded size, so long horizons and large networks
+stay tractable, at the price of optimality over the whole horizon.
+
+Remarks:
+- Storage content is not carried over between windows; the storage of a
+  window starts empty (as the storage of the full model does).
+- Earlier supply investments are not scaled with the supply external factor
+  (see ConstructionRules.maxSupplyConstraint).
+"""
+import time
+
+from case_imes import BuildModel
+from pyomo_helper_imes import RunningLocalServer, InvestmentSolution
+
+# Parameters of the case that are indexed by time period (last index)
+TIME_PARAMETER_NAMES = ['network_costs', 'supply_investment_costs',
+                        'supply_external_factor', 'converter_investment_costs',
+                        'storage_costs', 'demand', 'amount_given']
+
+# Investment variable -> (earlier investment parameter of the case, cost
+# parameter of the case)
+INVESTMENTS = {
+    'LineInvestmentMade': ('earlier_line_investment_made', 'network_costs'),
+    'SupplyInvestmentMade': ('earlier_supply_investment_made',
+                             'supply_investment_costs'),
+    'ConverterInvestmentMade': ('earlier_converter_investment_made',
+                                'converter_investment_costs'),
+    'StorageInvestmentMade': ('earlier_storage_investment_made',
+                              'storage_costs')}
+
+
+def WindowCase(case, time_periods, earlier):
+    # Copy of the case for the given time periods, with the earlier
+    # investments (earlier investment parameter -> {index: number})
+    window_case = dict(case)
+    window_case['time_periods'] = list(time_periods)
+    for name in TIME_PARAMETER_NAMES:
+        if(isinstance(case[name], dict)):
+            window_case[name] = {key: value for key, value in case[name].items()
+                                 if key[-1] in time_periods}
+    for (name, values) in earlier.items():
+        window_case[name] = dict(values)
+    return window_case
+
+
+def InvestmentCost(case, name, index):
+    # Cost of one investment (variable name, variable index) in the case
+    # (the costs of supply, converters and storage are not per location)
+    costs = case[INVESTMENTS[name][1]]
+    if(name == 'LineInvestmentMade'):
+        return costs.get(index, 0)
+    return costs[index[0], index[-1]]
+
+
+def PlanCost(case, investments):
+    # Objective value (total discounted investment costs) of an investment
+    # plan: variable name -> {index: number}
+    return sum(InvestmentCost(case, name, index) * value
+               for (name, values) in investments.items()
+               for (index, value) in values.items() if value)
+
+
+def SolveRollingHorizon(case, window=2, step=1,
+                        with_or_without_storage="With", solver_name='auto',
+                        time_limit=100, formulation=None, tee=False):
+    # case: see case_imes.BuildCaseData
+    # window: number of time periods per solve; step: number of time periods
+    # that are fixed after each solve (step <= window)
+    # Returns the investments (variable name -> {index: number}) over the
+    # whole horizon, their total costs and a log with one row per step.
+    if(step < 1 or step > window):
+        raise ValueError("The step (%d) must be between 1 and the window "
+                         "(%d)" % (step, window))
+    time_periods = case['time_periods']
+    earlier = {parameter: dict(case[parameter])
+               if isinstance(case[parameter], dict) else {}
+               for (parameter, _) in INVESTMENTS.values()}
+    investments = {name: {} for name in INVESTMENTS}
+    log = []
+    # The overlapping periods of the previous window are a warm start
+    solution = None
+
+    for start in range(0, len(time_periods), step):
+        window_periods = time_periods[start:start + window]
+        fixed_periods = window_periods[:step]
+        print("Solving time periods %s, fixing %s"
+              % (window_periods, fixed_periods))
+
+        start_time = time.perf_counter()
+        model = BuildModel(WindowCase(case, window_periods, earlier),
+                           with_or_without_storage,
+                           **(formulation or {'sparse': True}))
+        results = RunningLocalServer(model.model, solver_name, time_limit,
+                                     tee=tee, warm_start=solution)
+        termination_condition = str(results.solver.termination_condition)
+        solution = InvestmentSolution(model.model)
+        if(any(value is None for values in solution.values()
+               for value in values.values())):
+            raise RuntimeError("No solution for time periods %s (%s)"
+                               % (window_periods, termination_condition))
+        log.append({'time_periods': window_periods,
+                    'fixed_time_periods': fixed_periods,
+                    'termination_condition': termination_condition,
+                    'objective': model.model.Cost(),
+                    'time': time.perf_counter() - start_time})
+
+        # Fix the investments of the first periods and roll them into the
+        # earlier investments of the next windows
+        for (name, values) in solution.items():
+            parameter = INVESTMENTS[name][0]
+            for (index, value) in values.items():
+                if(index[-1] not in fixed_periods):
+                    continue
+                value = round(value)
+                investments[name][index] = value
+                earlier[parameter][index[:-1]] = \
+                    earlier[parameter].get(index[:-1], 0) + value
+
+    return investments, PlanCost(case, investments), log
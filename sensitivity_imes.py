@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Dual based sensitivity analysis of a solved model: how the objective moves
+when the demand, the given gas supply (AmountGiven) or a cost parameter
+changes, from one LP solve instead of a re-solve per change.
+
+The objective only has investment costs, so with the investments fixed the
+operational LP has no costs and all its duals are zero. The investments of
+the plan are therefore kept as lower bounds, and further investments are
+continuous: the duals are then the costs of the extra capacity that a change
+needs (zero where the plan has spare capacity, which is often the case with
+whole units). With keep_plan=False the plain LP relaxation is used instead,
+whose duals are the long run marginal costs of capacity.
+
+Marginal values (change of the objective per unit increase of a parameter):
+    Demand       dual of MassBalanceConstraint
+    AmountGiven  dual of MaxSupplyConstraint (gas)
+    *Costs       number of investments the cost parameter multiplies
+They hold for small changes; the reduced costs of the investment variables
+tell how much cheaper an investment has to be before more of it is made.
+
+Usage:
+    RunningLocalServer(model.model, 'auto', 100)
+    sensitivity = AnalyseSensitivity(model.model)
+    print(sensitivity['marginal_values']['Demand'])
+"""
+import time
+
+from pyomo.environ import Suffix, value
+from pyomo.core.expr.calculus.derivatives import differentiate
+
+from case_imes import BuildModel
+from export_imes import ValuesFrame, VARIABLE_COLUMNS, PARAMETER_COLUMNS
+from pyomo_helper_imes import (RunningLocalServer, INVESTMENT_VARIABLES,
+                               InvestmentSolution)
+from relaxation_imes import RelaxInvestments
+from solvers_imes import CreateSolver, DEFAULT_PROFILE
+
+# Index columns of the constraints
+CONSTRAINT_COLUMNS = {
+    'MassBalanceConstraint': ['energy_type', 'location', 'time_period'],
+    'MaxSupplyConstraint': ['energy_type', 'location', 'time_period'],
+    'MaxFlowConstraint': ['energy_type', 'location_from', 'location_to',
+                          'time_period'],
+    'MaxConvertedConstraint': ['energy_type', 'location', 'energy_converter',
+                               'time_period'],
+    'MaxAmountStoredIn': ['energy_type', 'location', 'time_period'],
+    'MaxAmountStoredOut': ['energy_type', 'location', 'time_period'],
+    'StorageLevelBalance': ['energy_type', 'location', 'time_period'],
+    'MinimumStoredConstraint': ['energy_type', 'location', 'time_period'],
+    'MaximumStoredConstraint': ['energy_type', 'location', 'time_period'],
+    'NoStorage': ['energy_type', 'location', 'time_period'],
+    'NoFlowInvestmentMade': ['energy_type', 'location_from', 'location_to',
+                             'time_period'],
+    'NoAmountFlow': ['energy_type', 'location_from', 'location_to',
+                     'time_period'],
+    'LineCapacityBalance': ['energy_type', 'location_from', 'location_to',
+                            'time_period'],
+    'SupplyCapacityBalance': ['supply_type', 'location', 'time_period'],
+    'ConverterCapacityBalance': ['energy_converter', 'location',
+                                 'time_period'],
+    'StorageCapacityBalance': ['energy_type', 'location', 'time_period']}
+
+# Cost parameters of the objective
+COST_PARAMETERS = ['NetworkCosts', 'SupplyInvestmentCosts',
+                   'ConverterInvestmentCosts', 'StorageCosts']
+
+
+def _ConstraintDuals(model, name, dual):
+    constraint = getattr(model, name)
+    return {index: dual.get(constraint[index], 0) for index in constraint}
+
+
+def CostMarginalValues(model, name):
+    # Derivative of the objective to every value of a cost parameter (the
+    # number of investments it multiplies)
+    parameter = getattr(model, name)
+    indices = list(parameter)
+    derivatives = differentiate(model.Cost.expr,
+                                wrt_list=[parameter[x] for x in indices])
+    return dict(zip(indices, derivatives))
+
+
+def AnalyseSensitivity(model, investments=None, solver_name='auto',
+                       time_limit=100, keep_plan=True):
+    # model: solved Pyomo model (the .model of math_prog_imes.Model)
+    # investments: plan (variable name -> {index: number}); default: the
+    # investments of the solution of model
+    # keep_plan: keep the investments of the plan as lower bounds (else the
+    # plain LP relaxation)
+    # Returns a dict of {name: DataFrame} dicts: duals (per constraint),
+    # reduced_costs (per investment variable) and marginal_values (per
+    # parameter), and the objective of the LP. The model is left with the
+    # LP solution, and its investments are integer again.
+    if(investments is None):
+        investments = InvestmentSolution(model)
+    start = time.perf_counter()
+
+    lower_bounds = []
+    if(keep_plan):
+        for (name, values) in investments.items():
+            variable = getattr(model, name)
+            for (index, number) in values.items():
+                lower_bounds.append((variable[index], variable[index].lb))
+                variable[index].setlb(round(number or 0))
+    RelaxInvestments(model)
+    if(not hasattr(model, 'dual')):
+        model.dual = Suffix(direction=Suffix.IMPORT)
+    if(not hasattr(model, 'rc')):
+        model.rc = Suffix(direction=Suffix.IMPORT)
+    try:
+        solver = CreateSolver(solver_name, profile=None,
+                              time_limit=time_limit)
+        output = solver.solve(model, load_solutions=False)
+        termination_condition = str(output.solver.termination_condition)
+        if(termination_condition != 'optimal'):
+            raise RuntimeError("Sensitivity LP not solved (%s)"
+                               % termination_condition)
+        model.solutions.load_from(output)
+
+        duals = {name: ValuesFrame(_ConstraintDuals(model, name, model.dual),
+                                   columns)
+                 for (name, columns) in CONSTRAINT_COLUMNS.items()
+                 if hasattr(model, name)}
+        reduced_costs = {
+            name: ValuesFrame({index: model.rc.get(getattr(model, name)[index],
+                                                   0)
+                               for index in getattr(model, name)},
+                              VARIABLE_COLUMNS[name])
+            for name in INVESTMENT_VARIABLES if hasattr(model, name)}
+        given = duals['MaxSupplyConstraint']
+        marginal_values = {
+            'Demand': duals['MassBalanceConstraint'],
+            'AmountGiven': given[given['energy_type'] == 'Gas']
+            .reset_index(drop=True)}
+        for name in COST_PARAMETERS:
+            marginal_values[name] = ValuesFrame(
+                CostMarginalValues(model, name), PARAMETER_COLUMNS[name])
+        objective = value(model.Cost)
+    finally:
+        RelaxInvestments(model, relax=False)
+        for (variable, lower_bound) in lower_bounds:
+            variable.setlb(lower_bound)
+    return {'objective': objective, 'duals': duals,
+            'reduced_costs': reduced_costs,
+            'marginal_values': marginal_values,
+            'seconds': time.perf_counter() - start}
+
+
+def SolveSensitivity(case, with_or_without_storage="With",
+                     solver_name='auto', time_limit=100, formulation=None,
+                     profile=DEFAULT_PROFILE, keep_plan=True):
+    # Build and solve the model of the case, and analyse the sensitivity of
+    # its solution (see AnalyseSensitivity)
+    model = BuildModel(case, with_or_without_storage,
+                       **(formulation or {'sparse': True}))
+    RunningLocalServer(model.model, solver_name, time_limit, tee=False,
+                       profile=profile)
+    plan_objective = value(model.model.Cost, exception=False)
+    if(plan_objective is None):
+        raise RuntimeError("Model not solved")
+    sensitivity = AnalyseSensitivity(model.model, None, solver_name,
+                                     time_limit, keep_plan)
+    sensitivity['plan_objective'] = plan_objective
+    return sensitivity
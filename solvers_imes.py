@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Solver backends. The options of a solve are given with generic names
+(time_limit, mip_gap, threads, presolve, mip_emphasis, seed) and translated
+into the names and values of the backend: Gurobi, HiGHS or CBC. The Pyomo
+solver name decides the backend ('gurobi', 'gurobi_direct',
+'gurobi_persistent' and 'appsi_gurobi' are all Gurobi, 'appsi_highs' and
+'highs' are HiGHS, ...).
+Solvers of another backend get the option names used so far (timelimit,
+mipgap, threads), and the options they do not know are left out.
+
+The solver name 'auto' takes the first installed solver of SOLVER_PREFERENCE,
+so a run falls back to HiGHS or CBC on a machine without a Gurobi licence.
+
+Profiles are named sets of options:
+    fast-approx: 5% gap, aggressive presolve, focus on finding solutions
+    production:  0.1% gap (the gap used so far)
+    exact:       no gap, focus on proving optimality
+Options that are given explicitly override the ones of the profile.
+
+Usage:
+    solver = CreateSolver('auto', 'fast-approx', time_limit=100, threads=4)
+    solver.solve(model)
+"""
+# Installed solvers are tried in this order for the solver name 'auto'
+SOLVER_PREFERENCE = ['gurobi', 'appsi_highs', 'cbc']
+
+SOLVER_PROFILES = {
+    'fast-approx': {'mip_gap': 0.05, 'presolve': 'aggressive',
+                    'mip_emphasis': 'feasibility'},
+    'production': {'mip_gap': 0.001},
+    'exact': {'mip_gap': 0, 'mip_emphasis': 'optimality'}}
+
+DEFAULT_PROFILE = 'production'
+
+# Generic option -> option name of the backend
+OPTION_NAMES = {
+    'gurobi': {'time_limit': 'TimeLimit', 'mip_gap': 'MIPGap',
+               'threads': 'Threads', 'presolve': 'Presolve',
+               'mip_emphasis': 'MIPFocus', 'seed': 'Seed'},
+    'highs': {'time_limit': 'time_limit', 'mip_gap': 'mip_rel_gap',
+              'threads': 'threads', 'presolve': 'presolve',
+              'mip_emphasis': 'mip_heuristic_effort', 'seed': 'random_seed'},
+    'cbc': {'time_limit': 'sec', 'mip_gap': 'ratio', 'threads': 'threads',
+            'presolve': 'presolve', 'seed': 'randomCbcSeed'},
+    'other': {'time_limit': 'timelimit', 'mip_gap': 'mipgap',
+              'threads': 'threads'}}
+
+# Generic value -> value of the backend, for the options with named values
+OPTION_VALUES = {
+    'gurobi': {'presolve': {'off': 0, 'auto': -1, 'aggressive': 2},
+               'mip_emphasis': {'balanced': 0, 'feasibility': 1,
+                                'optimality': 2, 'bound': 3}},
+    'highs': {'presolve': {'off': 'off', 'auto': 'choose',
+                           'aggressive': 'on'},
+              'mip_emphasis': {'balanced': 0.05, 'feasibility': 0.3,
+                               'optimality': 0.05, 'bound': 0.0}},
+    'cbc': {'presolve': {'off': 'off', 'auto': 'on', 'aggressive': 'more'}}}
+
+
+def SolverBackend(solver_name):
+    # Backend ('gurobi', 'highs', 'cbc' or 'other') of a Pyomo solver name
+    for backend in ['gurobi', 'highs', 'cbc']:
+        if(backend in solver_name.lower()):
+            return backend
+    return 'other'
+
+
+def AvailableSolver(preference=SOLVER_PREFERENCE):
+    # First installed (and licensed) solver of preference
+    from pyomo.environ import SolverFactory
+    for solver_name in preference:
+        try:
+            if(SolverFactory(solver_name).available(exception_flag=False)):
+                return solver_name
+        except Exception:
+            pass
+    raise RuntimeError("None of the solvers %s is available" % preference)
+
+
+def ProfileOptions(profile=DEFAULT_PROFILE, **options):
+    # Generic options of a profile, overridden by the options that are not
+    # None
+    if(profile is not None and profile not in SOLVER_PROFILES):
+        raise ValueError("Unknown solver profile %r, use one of %s"
+                         % (profile, list(SOLVER_PROFILES)))
+    profile_options = dict(SOLVER_PROFILES.get(profile, {}))
+    profile_options.update({key: value for (key, value) in options.items()
+                            if value is not None})
+    return profile_options
+
+
+def SolverOptions(solver_name, time_limit=None, mip_gap=None, threads=None,
+                  presolve=None, mip_emphasis=None, seed=None):
+    # Options of the backend of solver_name for the generic options that are
+    # not None; options the backend does not know are left out
+    # presolve: 'off', 'auto' or 'aggressive'
+    # mip_emphasis: 'balanced', 'feasibility', 'optimality' or 'bound'
+    # seed: random seed of the solver (a different seed gives a different
+    # search path)
+    backend = SolverBackend(solver_name)
+    names = OPTION_NAMES[backend]
+    values = OPTION_VALUES.get(backend, {})
+    options = {}
+    for (option, value) in [('time_limit', time_limit), ('mip_gap', mip_gap),
+                            ('threads', threads), ('presolve', presolve),
+                            ('mip_emphasis', mip_emphasis), ('seed', seed)]:
+        if(value is None or option not in names):
+            continue
+        if(option in values):
+            if(value not in values[option]):
+                raise ValueError("Unknown %s %r, use one of %s"
+                                 % (option, value, list(values[option])))
+            value = values[option][value]
+        options[names[option]] = value
+    return options
+
+
+def SolverName(solver_name):
+    # solver_name, or the first installed solver of SOLVER_PREFERENCE for
+    # 'auto' (or None)
+    if(solver_name is None or solver_name == 'auto'):
+        return AvailableSolver()
+    return solver_name
+
+
+def CreateSolver(solver_name, profile=DEFAULT_PROFILE, **options):
+    # Pyomo solver with the options of the profile and the generic options
+    # (see SolverOptions)
+    from pyomo.environ import SolverFactory
+    solver_name = SolverName(solver_name)
+    solver = SolverFactory(solver_name)
+    solver.options.update(SolverOptions(solver_name,
+                                        **ProfileOptions(profile, **options)))
+    return solver
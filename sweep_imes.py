@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Scenario sweep: builds and solves the model for every CO2 reduction column of
+the Supply sheet times a list of weather factors, in a local process pool,
+and collects the objectives and investment decisions in one table.
+
+The number of worker processes times the solver threads per worker is kept
+within the number of cores, so a multithreaded solver does not oversubscribe
+the machine.
+
+Neighbouring scenarios usually have similar investment plans. The scenarios
+are therefore ordered in chains of nearest neighbours (by their supply
+columns), and each solve in a chain starts from the investments of its
+predecessor. Use --no-warm-start to solve every scenario from scratch.
+
+With --relax-and-round, every scenario is solved approximately (LP relaxation
+and rounding, see relaxation_imes), in seconds instead of minutes; the
+lower_bound column then is the LP bound.
+
+Usage: python sweep_imes.py --workers 4 --solver-threads 2 --weather-factors 0.9 1.0 1.1
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from case_imes import (DB_FILE, LoadCaseTables, BuildCaseData, BuildModel,
+                       SupplyScenarioColumns)
+from solvers_imes import SOLVER_PROFILES, DEFAULT_PROFILE
+
+# Investments below this value are solver noise and not reported
+INVESTMENT_TOLERANCE = 1e-6
+
+RESULT_COLUMNS = ['supply_scenario', 'weather_factor', 'termination_condition',
+                  'objective', 'lower_bound', 'solve_time', 'variable',
+                  'index', 'value']
+
+# Case tables per worker process, loaded once per workbook
+_tables = {}
+
+
+def SweepScenarios(tables, scenarios=None, weather_factors=(1.0,)):
+    # All (supply scenario, weather factor) combinations of the sweep
+    if(scenarios is None):
+        scenarios = SupplyScenarioColumns(tables['Supply'])
+    return [(scenario, weather_factor) for scenario in scenarios
+            for weather_factor in weather_factors]
+
+
+def ScenarioVector(tables, supply_scenario, weather_factor):
+    # Supply column of a scenario, with the weather factor applied to the
+    # solar and wind factors as in case_imes.BuildCaseData
+    df_supply = tables['Supply']
+    values = df_supply[supply_scenario].to_numpy(dtype=float)
+    weather = df_supply['iProduct'].isin(['Solar', 'Wind']).to_numpy()
+    return np.where(weather, values * weather_factor, values)
+
+
+def ScenarioChains(tables, tasks, n_chains):
+    # Order the scenarios by greedy nearest neighbour search, starting at the
+    # first scenario, and split the order into n_chains consecutive chains
+    vectors = np.array([ScenarioVector(tables, *task) for task in tasks])
+    scale = np.abs(vectors).max(axis=0)
+    vectors = vectors / np.where(scale > 0, scale, 1)
+
+    order = [0]
+    remaining = list(range(1, len(tasks)))
+    while(remaining):
+        distances = np.linalg.norm(vectors[remaining] - vectors[order[-1]],
+                                   axis=1)
+        order.append(remaining.pop(int(np.argmin(distances))))
+    return [[tasks[i] for i in chain]
+            for chain in np.array_split(order, min(n_chains, len(tasks)))]
+
+
+def WorkerCount(workers=None, solver_threads=1):
+    # Worker processes that fit next to the solver threads on this machine
+    cores = os.cpu_count() or 1
+    max_workers = max(1, cores // max(1, solver_threads))
+    if(workers is None):
+        return max_workers
+    if(workers > max_workers):
+        print("Reducing the sweep from %d to %d workers (%d cores, %d solver "
+              "threads per worker)" % (workers, max_workers, cores,
+                                       solver_threads))
+    return max(1, min(workers, max_workers))
+
+
+def InvestmentDecisions(model):
+    # (variable, index, value) of all investments that are made, from the
+    # nonzero values of the solution arrays (see Model.VariableArray)
+    from pyomo_helper_imes import INVESTMENT_VARIABLES
+    decisions = []
+    for name in INVESTMENT_VARIABLES:
+        axes = [list(axis) for axis in model.VariableAxes(name)]
+        positions, values = model.VariableArray(name, sparse=True)
+        for (position, value) in zip(positions, values):
+            if(value > INVESTMENT_TOLERANCE):
+                # Pyomo style flat index (edges and arcs are spliced in)
+                index = ()
+                for (axis, i) in zip(axes, position):
+                    key = axis[i]
+                    index += key if isinstance(key, tuple) else (key,)
+                decisions.append((name, index, float(value)))
+    return decisions
+
+
+def SolveScenario(db_file, supply_scenario, weather_factor, solver_name,
+                  time_limit, solver_threads=1,
+                  with_or_without_storage="With", formulation=None,
+                  warm_start=None, profile=DEFAULT_PROFILE,
+                  relax_and_round=False):
+    # Build and solve one scenario; returns rows of the result table and the
+    # investment solution (None without a solution)
+    # relax_and_round: solve approximately (see relaxation_imes), without
+    # warm start and profile
+    from pyomo.environ import value
+    from pyomo_helper_imes import (RunningLocalServer, InvestmentSolution,
+                                   LoadSolution, INVESTMENT_VARIABLES)
+    from relaxation_imes import RelaxAndRound
+
+    if(db_file not in _tables):
+        _tables[db_file] = LoadCaseTables(db_file)
+    case = BuildCaseData(_tables[db_file], supply_scenario, weather_factor)
+    model = BuildModel(case, with_or_without_storage,
+                       **(formulation or {'sparse': True}))
+
+    # Whether the scenario was solved: from the status of the solve, not
+    # from a value of Cost, which the warm start already gives
+    start = time.perf_counter()
+    objective = None
+    solved = False
+    if(relax_and_round):
+        try:
+            _, report = RelaxAndRound(model, case, solver_name, time_limit,
+                                      threads=solver_threads)
+            termination_condition = report['termination_condition']
+            lower_bound = report['lp_bound']
+            solved = termination_condition == 'optimal'
+            if(solved):
+                objective = report['objective']
+        except RuntimeError as error:
+            termination_condition = str(error)
+            lower_bound = None
+    else:
+        # An infeasible scenario, or one without a solution at the time
+        # limit, is a row with its status and no objective; the other
+        # scenarios of the sweep go on
+        results = RunningLocalServer(model.model, solver_name, time_limit,
+                                     threads=solver_threads, tee=False,
+                                     warm_start=warm_start, profile=profile,
+                                     load_solutions=False)
+        termination_condition = str(results.solver.termination_condition)
+        lower_bound = results.problem.lower_bound
+        solved = LoadSolution(model.model, results)
+        if(solved):
+            objective = value(model.model.Cost, exception=False)
+    solve_time = time.perf_counter() - start
+    summary = [supply_scenario, weather_factor, termination_condition,
+               objective, lower_bound, solve_time]
+
+    solution = None
+    decisions = []
+    if(solved):
+        solution = InvestmentSolution(model.model)
+        decisions = InvestmentDecisions(model)
+    else:
+        # No decisions, and no warm start for the next scenario of the
+        # chain, from the values that the failed solve left behind
+        for name in INVESTMENT_VARIABLES:
+            for variable in getattr(model.model, name).values():
+                variable.set_value(None)
+    if(not decisions):
+        return [summary + [None, None, None]], solution
+    return [summary + list(decision) for decision in decisions], solution
+
+
+def SolveChain(db_file, chain, solver_name, time_limit, solver_threads=1,
+               with_or_without_storage="With", formulation=None,
+               warm_start=True, profile=DEFAULT_PROFILE,
+               relax_and_round=False):
+    # Solve the scenarios of a chain one after another, each warm started
+    # from the last solution found in the chain
+    rows = []
+    solution = None
+    for (supply_scenario, weather_factor) in chain:
+        scenario_rows, scenario_solution = SolveScenario(
+            db_file, supply_scenario, weather_factor, solver_name,
+            time_limit, solver_threads, with_or_without_storage, formulation,
+            solution if warm_start else None, profile, relax_and_round)
+        rows.extend(scenario_rows)
+        if(scenario_solution is not None):
+            solution = scenario_solution
+    return rows
+
+
+def RunSweep(db_file=DB_FILE, scenarios=None, weather_factors=(1.0,),
+             workers=None, solver_threads=1, solver_name='auto',
+             time_limit=100, with_or_without_storage="With",
+             formulation=None, warm_start=True, profile=DEFAULT_PROFILE,
+             relax_and_round=False):
+    # Solve all scenarios in a process pool and return one long table with a
+    # row per investment decision (objective and status repeated per row).
+    # With warm_start, each worker solves a chain of neighbouring scenarios.
+    tables = LoadCaseTables(db_file)
+    tasks = SweepScenarios(tables, scenarios, weather_factors)
+    workers = WorkerCount(workers, solver_threads)
+    if(warm_start):
+        chains = ScenarioChains(tables, tasks, workers)
+    else:
+        chains = [[task] for task in tasks]
+    print("Running %d scenarios on %d workers with %d solver threads each"
+          % (len(tasks), workers, solver_threads))
+
+    rows = []
+    # The solver threads of a worker are set with the threads option of the
+    # solver (see RunningLocalServer)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(SolveChain, db_file, chain, solver_name,
+                                   time_limit, solver_threads,
+                                   with_or_without_storage, formulation,
+                                   warm_start, profile, relax_and_round)
+                   for chain in chains]
+        for future in futures:
+            rows.extend(future.result())
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def SweepSummary(results):
+    # One row per scenario: status, objective and number of investments per
+    # investment type
+    from pyomo_helper_imes import INVESTMENT_VARIABLES
+    keys = ['supply_scenario', 'weather_factor']
+    summary = results.groupby(keys, sort=False)[
+        ['termination_condition', 'objective', 'lower_bound',
+         'solve_time']].first()
+    totals = results.pivot_table(index=keys, columns='variable',
+                                 values='value', aggfunc='sum')
+    return summary.join(totals.reindex(columns=INVESTMENT_VARIABLES))\
+        .fillna({x: 0 for x in INVESTMENT_VARIABLES})
+
+
+def AddSweepArguments(parser):
+    parser.add_argument('--db-file', default=DB_FILE)
+    parser.add_argument('--scenarios', nargs='*', default=None,
+                        help='Supply sheet columns (default: all)')
+    parser.add_argument('--weather-factors', nargs='*', type=float,
+                        default=[1.0])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--solver-threads', type=int, default=1)
+    parser.add_argument('--solver', default='auto',
+                        help="Pyomo solver name, or 'auto' for the first "
+                        "installed one")
+    parser.add_argument('--profile', choices=list(SOLVER_PROFILES),
+                        default=DEFAULT_PROFILE)
+    parser.add_argument('--time-limit', type=float, default=100)
+    parser.add_argument('--no-warm-start', dest='warm_start',
+                        action='store_false')
+    parser.add_argument('--relax-and-round', action='store_true',
+                        help='Solve the LP relaxation and round the '
+                        'investments (fast, approximate)')
+    parser.add_argument('--output', default='sweep_results.csv')
+    return parser
+
+
+def main(args):
+    results = RunSweep(args.db_file, args.scenarios, args.weather_factors,
+                       args.workers, args.solver_threads, args.solver,
+                       args.time_limit, warm_start=args.warm_start,
+                       profile=args.profile,
+                       relax_and_round=args.relax_and_round)
+    results.to_csv(args.output, index=False)
+    print(SweepSummary(results))
+
+
+if __name__ == '__main__':
+    main(AddSweepArguments(argparse.ArgumentParser()).parse_args())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+Synthetic cases of any size, with the sheets and columns of
+IMES_21node_case_data.xlsx, for scaling tests and benchmarks.
+
+The network is a ring with a few random chords (every location has about
+four neighbours), and every edge is listed once in the Network sheet. The
+energy carriers, converters and supply types are the ones of the model
+(case_imes.BuildCaseData fixes them), so only the number of locations and
+time periods can be changed. Demand is drawn such that every location can
+cover it with local supply and conversion, within the investment limits of
+the model, so the cases are feasible.
+
+Usage: python synthetic_case_imes.py <locations> <time periods> [file name]
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ENERGY_CARRIERS = ['Electricity', 'Gas', 'Heat']
+ENERGY_CONVERTERS = ['CHP', 'HP', 'P2G']
+SUPPLY_TYPES = ['Solar', 'Wind']
+SUPPLY_SCENARIOS = ['95%_red', '90%_red']
+
+# Efficiency of converting the second carrier into the first one per
+# converter; -1 for the carrier that goes in
+CONVERSION_EFFICIENCIES = {('Electricity', 'Gas', 'CHP'): 0.4,
+                           ('Heat', 'Gas', 'CHP'): 0.45,
+                           ('Gas', 'Gas', 'CHP'): -1,
+                           ('Heat', 'Electricity', 'HP'): 3.0,
+                           ('Electricity', 'Electricity', 'HP'): -1,
+                           ('Gas', 'Electricity', 'P2G'): 0.6,
+                           ('Electricity', 'Electricity', 'P2G'): -1}
+
+
+def SyntheticEdges(locations, rng, chords_per_location=1):
+    # Ring over all locations plus random chords, each edge once
+    n_locations = len(locations)
+    edges = set()
+    if(n_locations > 1):
+        for i in range(n_locations):
+            edges.add(tuple(sorted((i, (i + 1) % n_locations))))
+    if(n_locations > 3):
+        for i in range(n_locations):
+            for _ in range(chords_per_location):
+                j = int(rng.integers(n_locations))
+                if(j != i):
+                    edges.add(tuple(sorted((i, j))))
+    return [(locations[i], locations[j]) for (i, j) in sorted(edges)]
+
+
+def SyntheticCaseTables(n_locations, n_time_periods, seed=0):
+    # All sheets of a synthetic case: sheet name -> DataFrame
+    rng = np.random.default_rng(seed)
+    locations = ['Node_%d' % (i + 1) for i in range(n_locations)]
+    time_periods = [2018 + 2 * i for i in range(n_time_periods)]
+    tables = {}
+
+    tables['Locations'] = pd.DataFrame({'Locations': locations})
+    tables['TimePeriods'] = pd.DataFrame({'TimeSlot': time_periods})
+    tables['Network'] = pd.DataFrame(
+        [(carrier, location_from, location_to, float(rng.uniform(5, 6)))
+         for carrier in ENERGY_CARRIERS
+         for (location_from, location_to) in SyntheticEdges(locations, rng)],
+        columns=['Type', 'LocationFrom', 'LocationTo', 'Costs'])
+    tables['MaxFlow'] = pd.DataFrame({'Type': ENERGY_CARRIERS,
+                                      'MaxFlowLine': [2.0, 2.0, 1.0],
+                                      'LossFactor': [0.02, 0.01, 0.05]})
+
+    # Demand grows slowly over the time periods
+    growth = np.linspace(1.0, 1.3, n_time_periods)
+    base_demand = {'Electricity': rng.uniform(0.5, 2.0, size=n_locations),
+                   'Gas': np.full(n_locations, 0.3),
+                   'Heat': rng.uniform(0.5, 2.0, size=n_locations)}
+    tables['Demand'] = pd.DataFrame(
+        [(carrier, location, time_period,
+          float(base_demand[carrier][i] *
+                (growth[k] if carrier != 'Gas' else 1.0)))
+         for carrier in ENERGY_CARRIERS
+         for (i, location) in enumerate(locations)
+         for (k, time_period) in enumerate(time_periods)],
+        columns=['Type', 'Location', 'TimePeriod', 'Demand'])
+
+    # Given gas supply and the solar and wind factors per scenario
+    rows = []
+    for product in ['Gas'] + SUPPLY_TYPES:
+        for location in locations:
+            for time_period in time_periods:
+                if(product == 'Gas'):
+                    rows.append((product, location, time_period, 4.0, 3.0))
+                else:
+                    rows.append((product, location, time_period, 1.0,
+                                 float(rng.uniform(0.8, 1.0))))
+    tables['Supply'] = pd.DataFrame(
+        rows, columns=['iProduct', 'iLocation', 'iTimeSlot'] +
+        SUPPLY_SCENARIOS)
+    tables['SupplyUnits'] = pd.DataFrame(
+        [(carrier, supply_type, 7.0 if supply_type == 'Solar' else 9.0,
+          1.0 if carrier == 'Electricity' else 0.0)
+         for carrier in ENERGY_CARRIERS for supply_type in SUPPLY_TYPES],
+        columns=['Type', 'SupplyType', 'Costs', 'MaxSupply'])
+
+    tables['ConversionUnits'] = pd.DataFrame({'Conversion': ENERGY_CONVERTERS,
+                                              'Costs': [10.0, 8.0, 12.0]})
+    tables['ConversionEfficiencies'] = pd.DataFrame(
+        [(carrier_1, carrier_2, converter,
+          CONVERSION_EFFICIENCIES.get((carrier_1, carrier_2, converter), 0.0))
+         for carrier_1 in ENERGY_CARRIERS for carrier_2 in ENERGY_CARRIERS
+         for converter in ENERGY_CONVERTERS],
+        columns=['Type1', 'Type2', 'ConversionType', 'Efficiency'])
+    tables['MaxConverted'] = pd.DataFrame(
+        [(carrier, converter, 2.0) for carrier in ENERGY_CARRIERS
+         for converter in ENERGY_CONVERTERS],
+        columns=['Type', 'ConversionUnit', 'MaxConverted'])
+    tables['StorageUnits'] = pd.DataFrame({'StorageType': ENERGY_CARRIERS,
+                                           'Costs': [5.0, 3.0, 2.0],
+                                           'StockDrain': [0.9, 0.99, 0.8],
+                                           'MinStorageLevel': [0.0, 0.0, 0.0],
+                                           'MaxStorageLevel': [1.0, 1.0, 1.0]})
+    return tables
+
+
+def WriteSyntheticCase(file_name, n_locations, n_time_periods, seed=0):
+    # Write a synthetic case workbook, which can be used as db_file
+    tables = SyntheticCaseTables(n_locations, n_time_periods, seed)
+    if(os.path.dirname(file_name)):
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with pd.ExcelWriter(file_name) as writer:
+        for (sheet_name, df) in tables.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return tables
+
+
+if __name__ == '__main__':
+    n_locations = int(sys.argv[1])
+    n_time_periods = int(sys.argv[2])
+    file_name = sys.argv[3] if len(sys.argv) > 3 else \
+        './data/IMES_%dnode_%dperiod_synthetic.xlsx' % (n_locations,
+                                                         n_time_periods)
+    WriteSyntheticCase(file_name, n_locations, n_time_periods)
+    print("Written %s" % file_name)